@@ -0,0 +1,376 @@
+"""
+Benchmark for the ladder commands.
+
+Builds synthetic ladders of different sizes and drives the
+cog's command callbacks with fake Discord objects, so no
+connection or token is needed. Every Discord request can
+be given a simulated latency.
+
+For every ladder size it reports per command latency
+percentiles, memory allocated while running the command
+and the bytes written to disk.
+
+    python benchmark.py
+    python benchmark.py --sizes 10,1000,100000 --match-fractions 0,0.5 --latency 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+# The benchmark never connects to Discord, so no token is needed
+try:
+    import my_token
+except ImportError:
+    my_token = types.ModuleType('my_token')
+    my_token.MY_DISCORD_TOKEN = None
+    sys.modules['my_token'] = my_token
+
+import discord
+from discord.ext import commands
+
+import ladderbot2
+
+
+class FakeUser:
+    """
+    Stands in for a discord.Member, with only what the cog uses.
+    """
+    __slots__ = ('id', 'display_name', 'name', 'mention', 'bot')
+
+    def __init__(self, user_id, bot):
+        self.id = user_id
+        self.display_name = f"Player{user_id}"
+        self.name = self.display_name
+        self.mention = f"<@{user_id}>"
+        self.bot = bot
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    async def send(self, content=None, **kwargs):
+        await self.bot.simulate_request()
+
+
+class FakeMessage:
+    """
+    A message in a FakeChannel that can be edited and deleted.
+    """
+    def __init__(self, channel, message_id, content):
+        self.channel = channel
+        self.id = message_id
+        self.content = content
+
+    async def edit(self, content=None, **kwargs):
+        await self.channel.bot.simulate_request()
+        self.content = content
+        return self
+
+    async def delete(self):
+        await self.channel.bot.simulate_request()
+
+
+class FakeChannel:
+    """
+    A text channel that keeps no history, sending only
+    costs the simulated latency.
+    """
+    def __init__(self, channel_id, guild, bot):
+        self.id = channel_id
+        self.guild = guild
+        self.bot = bot
+        self.mention = f"<#{channel_id}>"
+        self.next_message_id = 1
+
+    async def send(self, content=None, **kwargs):
+        await self.bot.simulate_request()
+        self.next_message_id += 1
+        return FakeMessage(self, self.next_message_id, content)
+
+    def get_partial_message(self, message_id):
+        return FakeMessage(self, message_id, None)
+
+    async def history(self, limit=1):
+        await self.bot.simulate_request()
+        return
+        yield
+
+
+class FakeGuild:
+    """
+    A guild whose member cache holds every synthetic player.
+    """
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.members = {}
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+
+class FakeContext:
+    """
+    Stands in for commands.Context when calling a command's callback.
+    """
+    def __init__(self, author, guild, channel):
+        self.author = author
+        self.guild = guild
+        self.channel = channel
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+
+class BenchmarkBot(commands.Bot):
+    """
+    A bot that is never logged in. Channels and users come from the
+    benchmark instead of the gateway, and every request to Discord
+    waits for the simulated latency.
+    """
+    def __init__(self, latency):
+        super().__init__(command_prefix='!', intents=discord.Intents.none())
+        self.request_latency = latency
+        self.fake_channels = {}
+        self.fake_users = {}
+
+    async def simulate_request(self):
+        if self.request_latency:
+            await asyncio.sleep(self.request_latency)
+        else:
+            await asyncio.sleep(0)
+
+    def get_channel(self, channel_id):
+        return self.fake_channels.get(channel_id)
+
+    def get_user(self, user_id):
+        return self.fake_users.get(user_id)
+
+    async def fetch_user(self, user_id):
+        await self.simulate_request()
+        return self.fake_users[user_id]
+
+
+def written_bytes():
+    """
+    Returns the bytes this process has written so far,
+    or None where /proc/self/io is not available.
+    """
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def percentile(values, fraction):
+    """
+    Returns the value at the given fraction of the sorted values.
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class LadderBenchmark:
+    """
+    One synthetic ladder with teams of two players, some of
+    them already in a match, and the commands to run on it.
+    """
+    def __init__(self, team_count, match_fraction, latency):
+        self.team_count = team_count
+        self.match_fraction = match_fraction
+        self.bot = BenchmarkBot(latency)
+        self.guild = FakeGuild(1)
+        self.channel = FakeChannel(1, self.guild, self.bot)
+        self.bot.fake_channels[self.channel.id] = self.channel
+        self.cog = None
+        self.ladder = None
+        self.next_user_id = 1
+        self.next_team = team_count
+        self.report_winner_is_challenger = True
+
+    def new_user(self):
+        user = FakeUser(self.next_user_id, self.bot)
+        self.next_user_id += 1
+        self.guild.members[user.id] = user
+        self.bot.fake_users[user.id] = user
+        return user
+
+    def ctx(self, author):
+        return FakeContext(author, self.guild, self.channel)
+
+    async def setup(self):
+        """
+        Adds the cog to the bot and fills its ladder
+        directly instead of through the commands.
+        """
+        self.cog = ladderbot2.Ladderbot(self.bot)
+        await self.bot.add_cog(self.cog)
+        self.ladder = await self.cog.get_ladder(self.ctx(self.new_user()))
+
+        for index in range(self.team_count):
+            members = [self.new_user().id, self.new_user().id]
+            self.ladder.teams[f"Team{index}"] = ladderbot2.Team(members, index + 1)
+        self.ladder._rebuild_member_index()
+        self.ladder._rebuild_rank_order()
+
+        # Pair up neighbouring teams from the top until the wanted share of teams is in a match
+        for index in range(1, int(self.team_count * self.match_fraction), 2):
+            challenger, challenged = self.ladder.rank_order[index], self.ladder.rank_order[index - 1]
+            self.ladder._add_match(challenger, challenger, challenged)
+
+        self.ladder.ladder_running = True
+        self.ladder.save_state()
+        self.ladder.compact_event_log()
+        await self.ladder.storage.flush()
+
+    async def close(self):
+        await self.bot.remove_cog(self.cog.qualified_name)
+
+    def member_of(self, team_name):
+        return self.guild.members[self.ladder.teams[team_name].members[0]]
+
+    # Every command has a prepare step that is not timed and returns the timed call
+
+    def prepare_register_team(self):
+        team_name = f"Team{self.next_team}"
+        self.next_team += 1
+        return lambda: self.cog.register_team.callback(self.cog, self.ctx(self.new_user()), team_name)
+
+    def prepare_challenge(self):
+        # Find two neighbouring teams that are both free, freeing a match if there are none
+        free_index = None
+        for _ in range(2):
+            for index in random.sample(range(1, len(self.ladder.rank_order)), min(50, len(self.ladder.rank_order) - 1)):
+                if not self.ladder._is_team_in_match(self.ladder.rank_order[index]) and not self.ladder._is_team_in_match(self.ladder.rank_order[index - 1]):
+                    free_index = index
+                    break
+            if free_index is not None:
+                break
+            self.ladder._remove_match(next(iter(self.ladder.matches)))
+
+        challenger, challenged = self.ladder.rank_order[free_index], self.ladder.rank_order[free_index - 1]
+        return lambda: self.cog.challenge.callback(self.cog, self.ctx(self.member_of(challenger)), challenger, challenged)
+
+    def prepare_report_win(self):
+        if not self.ladder.matches:
+            challenger, challenged = self.ladder.rank_order[1], self.ladder.rank_order[0]
+            self.ladder._add_match(challenger, challenger, challenged)
+
+        # Alternate between challenger wins, which shift ranks, and challenged wins, which do not
+        match = random.choice(list(self.ladder.matches.values()))
+        winner = match.challenger if self.report_winner_is_challenger else match.challenged
+        self.report_winner_is_challenger = not self.report_winner_is_challenger
+        return lambda: self.cog.report_win.callback(self.cog, self.ctx(self.member_of(winner)), winner)
+
+    def prepare_set_rank(self):
+        team_name = random.choice(self.ladder.rank_order)
+        rank = random.randint(1, len(self.ladder.rank_order))
+        return lambda: self.cog.set_rank.callback(self.cog, self.ctx(self.member_of(team_name)), team_name, rank)
+
+    def prepare_normalize_ranks(self):
+        async def normalize_ranks():
+            self.ladder.normalize_ranks()
+        return normalize_ranks
+
+    def prepare_generate_standings(self):
+        return lambda: self.ladder.generate_standings(self.guild)
+
+    COMMANDS = ['register_team', 'challenge', 'report_win', 'set_rank', 'normalize_ranks', 'generate_standings']
+
+    async def measure(self, command, iterations, alloc_iterations):
+        """
+        Runs a command iterations times for its latency and disk
+        writes, then alloc_iterations times under tracemalloc for
+        the memory it allocates. Returns a row of results.
+        """
+        prepare = getattr(self, f"prepare_{command}")
+
+        await self.ladder.storage.flush()
+        bytes_before = written_bytes()
+        latencies = []
+        for _ in range(iterations):
+            call = prepare()
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+        await self.ladder.storage.flush()
+        bytes_after = written_bytes()
+
+        allocations = []
+        tracemalloc.start()
+        for _ in range(alloc_iterations):
+            call = prepare()
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            await call()
+            allocations.append(tracemalloc.get_traced_memory()[1] - before)
+        tracemalloc.stop()
+
+        return {
+            'command': command,
+            'p50': percentile(latencies, 0.50) * 1000,
+            'p95': percentile(latencies, 0.95) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+            'max': max(latencies) * 1000,
+            'alloc': sum(allocations) / len(allocations) / 1024 if allocations else 0,
+            'disk': (bytes_after - bytes_before) / iterations / 1024 if bytes_before is not None else None,
+        }
+
+
+def print_rows(title, rows):
+    print(f"\n{title}")
+    print(f"{'command':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'alloc KiB':>12}{'disk KiB/op':>13}")
+    for row in rows:
+        disk = f"{row['disk']:.1f}" if row['disk'] is not None else 'n/a'
+        print(f"{row['command']:<20}{row['p50']:>10.3f}{row['p95']:>10.3f}{row['p99']:>10.3f}{row['max']:>10.3f}{row['alloc']:>12.1f}{disk:>13}")
+
+
+async def run(args):
+    for team_count in args.sizes:
+        for match_fraction in args.match_fractions:
+            # Every ladder gets its own folder, as the cog stores its ladders relative to the working directory
+            with tempfile.TemporaryDirectory() as directory:
+                os.chdir(directory)
+                benchmark = LadderBenchmark(team_count, match_fraction, args.latency / 1000)
+                await benchmark.setup()
+                rows = [await benchmark.measure(command, args.iterations, args.alloc_iterations) for command in args.commands]
+                await benchmark.close()
+                os.chdir(args.start_directory)
+            print_rows(f"{team_count} teams, {int(match_fraction * 100)}% in a match, {args.backend} storage, {args.latency} ms latency", rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ladder commands on synthetic ladders.")
+    parser.add_argument('--sizes', default='10,100,1000,10000', help="comma separated team counts, e.g. 10,1000,100000")
+    parser.add_argument('--match-fractions', default='0.2', help="comma separated share of teams already in a match")
+    parser.add_argument('--iterations', type=int, default=50, help="timed runs of each command")
+    parser.add_argument('--alloc-iterations', type=int, default=5, help="runs of each command under tracemalloc")
+    parser.add_argument('--latency', type=float, default=0.0, help="simulated latency of every Discord request in ms")
+    parser.add_argument('--backend', choices=['json', 'sqlite'], default=ladderbot2.STORAGE_BACKEND)
+    parser.add_argument('--commands', default=','.join(LadderBenchmark.COMMANDS), help="comma separated commands to run")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    args.sizes = [int(size) for size in args.sizes.split(',')]
+    args.match_fractions = [float(fraction) for fraction in args.match_fractions.split(',')]
+    args.commands = args.commands.split(',')
+    args.start_directory = os.getcwd()
+    ladderbot2.STORAGE_BACKEND = args.backend
+    random.seed(args.seed)
+
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
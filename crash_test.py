@@ -0,0 +1,194 @@
+"""
+Crash test for the json storage.
+
+Runs a writer in a child process that records team events
+to a JsonStorage as fast as it can, compacting them into
+teams.json every so often, and kills it with SIGKILL at a
+random moment. The storage is then loaded again and checked:
+
+- teams.json, matches.json and events.log must still load
+- every event the writer had confirmed as flushed must be there
+- the events must be a gap-free prefix of what was written
+
+The next round restarts the writer on the same files, so it
+loads what survived and appends more events before it is
+killed again. Every third round also cuts the last event in
+half, like a kill in the middle of an append, then restarts,
+appends one more event and restarts again to check that the
+new event was not lost behind the torn one.
+
+    python crash_test.py
+    python crash_test.py --rounds 50 --compact-every 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+# The crash test never connects to Discord, so no token is needed
+try:
+    import my_token
+except ImportError:
+    my_token = types.ModuleType('my_token')
+    my_token.MY_DISCORD_TOKEN = None
+    sys.modules['my_token'] = my_token
+
+import ladderbot2
+
+
+def create_storage(directory, compact_every):
+    """
+    Creates a JsonStorage on the files in directory.
+    """
+    storage = ladderbot2.JsonStorage(
+        os.path.join(directory, 'teams.json'),
+        os.path.join(directory, 'matches.json'),
+        os.path.join(directory, 'state.json'),
+        os.path.join(directory, 'events.log'),
+        compact_every=compact_every)
+    storage.writer.delay = 0.01
+    return storage
+
+
+def team_number(team_name):
+    return int(team_name[len('Team'):])
+
+
+async def write_forever(directory, compact_every):
+    """
+    Runs in the child process. Loads what survived the last
+    crash, then records one new team per event until it is
+    killed. After every flush the highest team number that
+    is on disk is printed, so the parent knows what must
+    survive the kill.
+    """
+    storage = create_storage(directory, compact_every)
+    teams = storage.load_teams()
+    storage.load_matches()
+    number = max((team_number(team_name) for team_name in teams), default=0)
+
+    while True:
+        for _ in range(random.randint(1, 20)):
+            number += 1
+            team_name = f"Team{number}"
+            teams[team_name] = {'members': [number], 'rank': number, 'wins': 0, 'losses': 0}
+            if storage.record_event({'type': 'team_registered', 'teams': {team_name: teams[team_name]}}):
+                storage.compact(teams, {})
+            storage.save_state({'ladder_running': True, 'last_team': number})
+
+        # Sometimes wait for the flush to finish and confirm everything written so far
+        if random.random() < 0.3:
+            await storage.flush()
+            print(number, flush=True)
+        else:
+            await asyncio.sleep(0)
+
+
+def tear_last_event(directory):
+    """
+    Appends half of an event to events.log, as a kill in
+    the middle of an append would leave it.
+    """
+    with open(os.path.join(directory, 'events.log'), 'a') as f:
+        f.write('{"type": "team_registered", "teams": {"Team')
+
+
+def append_after_restart(directory, compact_every):
+    """
+    Restarts on the files and records one more team right
+    away, before any snapshot could hide a lost event.
+    Returns the number of that team.
+    """
+    storage = create_storage(directory, compact_every)
+    teams = storage.load_teams()
+    storage.load_matches()
+    number = max((team_number(team_name) for team_name in teams), default=0) + 1
+    team_name = f"Team{number}"
+
+    # Outside of an event loop the writer writes right away
+    storage.record_event({'type': 'team_registered', 'teams': {team_name: {'members': [number], 'rank': number, 'wins': 0, 'losses': 0}}})
+    return number
+
+
+def check(directory, compact_every, confirmed):
+    """
+    Loads the storage like the bot does at startup and checks
+    that nothing confirmed was lost. Returns the number of
+    teams that survived.
+    """
+    storage = create_storage(directory, compact_every)
+    teams = storage.load_teams()
+    storage.load_matches()
+    state = storage.load_state()
+
+    numbers = sorted(team_number(team_name) for team_name in teams)
+    if numbers != list(range(1, len(numbers) + 1)):
+        raise AssertionError(f"Teams have gaps after recovery: {numbers[:10]}...")
+    if len(numbers) < confirmed:
+        raise AssertionError(f"Only {len(numbers)} teams survived but {confirmed} were confirmed on disk.")
+    if state is not None and not isinstance(state, dict):
+        raise AssertionError(f"state.json did not load as an object: {state!r}")
+    for team_name, team_data in teams.items():
+        if team_data['members'] != [team_number(team_name)]:
+            raise AssertionError(f"{team_name} was not recovered intact: {team_data!r}")
+    return len(numbers)
+
+
+def run_round(directory, args):
+    """
+    Starts the writer, kills it after a random time and
+    returns the highest team number it had confirmed.
+    """
+    child = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--child', directory, '--compact-every', str(args.compact_every)],
+        stdout=subprocess.PIPE, text=True)
+    time.sleep(random.uniform(args.min_run, args.max_run))
+    child.send_signal(signal.SIGKILL)
+    output, _ = child.communicate()
+    confirmed = [int(line) for line in output.splitlines() if line.isdigit()]
+    return max(confirmed, default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kill a json storage writer mid-flush and check that it recovers.")
+    parser.add_argument('--rounds', type=int, default=20, help="number of kill and restart rounds")
+    parser.add_argument('--compact-every', type=int, default=50, help="events between snapshots of teams.json")
+    parser.add_argument('--min-run', type=float, default=0.2, help="shortest time in seconds before a kill")
+    parser.add_argument('--max-run', type=float, default=1.0, help="longest time in seconds before a kill")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(write_forever(args.child, args.compact_every))
+        return
+
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        confirmed = 0
+        for round_number in range(1, args.rounds + 1):
+            confirmed = max(confirmed, run_round(directory, args))
+            survived = check(directory, args.compact_every, confirmed)
+
+            print(f"round {round_number}: {survived} teams recovered, {confirmed} confirmed")
+
+            # Every third round also tears the last event, then restarts, appends one more team and restarts again
+            if round_number % 3 == 0:
+                tear_last_event(directory)
+                confirmed = append_after_restart(directory, args.compact_every)
+                survived = check(directory, args.compact_every, confirmed)
+                print(f"round {round_number}: tore the last event, appended Team{confirmed} after restarting, {survived} teams recovered")
+
+        # Restart once more after the last kill and check again
+        survived = check(directory, args.compact_every, confirmed)
+    print(f"Recovered every confirmed team after {args.rounds} kills, {survived} teams in total.")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,3164 @@
 # v2.0
 import discord
 from discord.ext import commands, tasks
+import csv
+import gzip
+import heapq
+import io
 import json
 import os
+import re
 import time
 import asyncio
+import sqlite3
+import threading
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+# NumPy is optional, it only speeds up recomputing every rating from the match history
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 """
 Delete 'from my_token import MY_DISCORD_TOKEN' when manually
 entering a full token string at the bottom of the code
 
-To use the my_token import correctly, please refer to the
-NOTE's at the very bottom of the code in main() function
-"""
+To use the my_token import correctly, please refer to the
+NOTE's at the very bottom of the code in main() function
+"""
+
+from my_token import MY_DISCORD_TOKEN
+
+"""
+NOTE: Every ladder is stored in its own folder, ladders/<guild ID>/<ladder name>/,
+in teams.json, matches.json and state.json by default. For very large ladders
+set STORAGE_BACKEND to 'sqlite' to store each ladder in a ladderbot.db instead.
+The first time a ladder is loaded with 'sqlite', any existing .json data is
+copied into the database.
+"""
+STORAGE_BACKEND = 'json'
+
+# Name of the ladder every guild gets, more ladders can be added with !use_ladder
+DEFAULT_LADDER = 'default'
+
+"""
+NOTE: The bot counts and times its commands, saves, board updates and requests
+to Discord, shown by !ladder_stats. Set METRICS_ENABLED to False to turn this off.
+Set METRICS_FILE to a path such as 'ladderbot.prom' to also write the numbers
+there every minute in the Prometheus text format.
+"""
+METRICS_ENABLED = True
+METRICS_FILE = None
+
+"""
+NOTE: Every team has an Elo rating next to its rank, updated with each reported
+result. New teams start at RATING_START, and RATING_K_FACTOR is the most points
+a single result can move a team's rating.
+"""
+RATING_START = 1500
+RATING_K_FACTOR = 32
+
+"""
+NOTE: A challenge expires CHALLENGE_DEADLINE seconds after it is issued if no result
+has been reported by then. Set EXPIRED_CHALLENGE_ACTION to 'forfeit' to give the win
+to the challenger, as if the challenged team forfeited, or to 'cancel' to only cancel
+the challenge. Set CHALLENGE_DEADLINE to None for challenges to never expire.
+"""
+CHALLENGE_DEADLINE = 7 * 24 * 60 * 60
+EXPIRED_CHALLENGE_ACTION = 'cancel'
+
+class Histogram:
+    """
+    Counts of observed durations in fixed buckets, like
+    a Prometheus histogram. Quantiles are estimated as
+    the upper bound of the bucket they fall in.
+    """
+    # Bucket upper bounds in seconds, the last bucket holds everything slower
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        """
+        Returns the upper bound of the bucket holding the q quantile.
+        """
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= q * self.count:
+                return self.BUCKETS[index] if index < len(self.BUCKETS) else float('inf')
+        return 0.0
+
+class Metrics:
+    """
+    Counters and latency histograms for the hot paths of
+    the bot, keyed by name and labels.
+
+    When disabled every method returns right away, and
+    timer() hands back a shared do-nothing context manager.
+    Writes happen on worker threads too, so updates are
+    made under a lock.
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def count(self, name, amount=1, **labels):
+        """
+        Adds amount to a counter.
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        """
+        Records a duration in a histogram.
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def timer(self, name, **labels):
+        """
+        Returns a context manager that records how long
+        its block took in a histogram.
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._timer(name, labels)
+
+    @contextmanager
+    def _timer(self, name, labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def summary_lines(self):
+        """
+        Formats every histogram and counter as readable
+        lines, used by the !ladder_stats command.
+        """
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+
+        lines = []
+        for (name, labels), histogram in histograms:
+            label_text = ', '.join(f"{value}" for key, value in labels)
+            lines.append(f"{name} {label_text}: {histogram.count} calls, mean {histogram.sum / histogram.count * 1000:.1f} ms, "
+                         f"p95 < {histogram.quantile(0.95) * 1000:g} ms")
+        for (name, labels), value in counters:
+            label_text = ', '.join(f"{value}" for key, value in labels)
+            lines.append(f"{name} {label_text}: {value}")
+        return lines
+
+    def prometheus_text(self):
+        """
+        Formats every counter and histogram in the
+        Prometheus text exposition format.
+        """
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+
+        def label_text(labels, *extra):
+            pairs = [f'{key}="{value}"' for key, value in (*labels, *extra)]
+            return '{' + ','.join(pairs) + '}' if pairs else ''
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE ladderbot_{name} counter")
+            lines.append(f"ladderbot_{name}{label_text(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE ladderbot_{name} histogram")
+            cumulative = 0
+            for bound, count in zip((*Histogram.BUCKETS, '+Inf'), histogram.counts):
+                cumulative += count
+                lines.append(f"ladderbot_{name}_bucket{label_text(labels, ('le', bound))} {cumulative}")
+            lines.append(f"ladderbot_{name}_sum{label_text(labels)} {histogram.sum}")
+            lines.append(f"ladderbot_{name}_count{label_text(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+# Metrics shared by every ladder, storage and board
+metrics = Metrics(METRICS_ENABLED)
+
+class AsyncFileWriter:
+    """
+    Writes files from a background thread so the
+    bot never waits on the disk while handling commands.
+
+    Writes requested within delay seconds of each other
+    are coalesced, so a file is only written once per
+    window with its most recent contents, and appends
+    are batched into a single write.
+
+    Overwrites are crash-safe: the new contents go to a
+    temp file that is fsynced and renamed over the old
+    file, and the previous version is kept as a .bak
+    backup that read_json falls back on.
+    """
+    def __init__(self, delay=0.5):
+        self.delay = delay
+
+        # Path -> [mode, text, backup] of writes waiting for the next flush, in the order they must happen
+        self.pending = {}
+
+        # A single worker thread keeps every flush in the order it was requested
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ladderbot-writer')
+        self.flush_task = None
+
+    def write(self, path, text, backup=True):
+        """
+        Schedules the file at path to be overwritten with text.
+        Any earlier pending write or append to it is replaced.
+
+        When backup is True the previous version of the
+        file is kept next to it with a .bak extension.
+        """
+        # Re-inserting moves the file to the end so it is written after everything requested before it
+        self.pending.pop(path, None)
+        self.pending[path] = ['w', text, backup]
+        self._schedule()
+
+    def append(self, path, text):
+        """
+        Schedules text to be appended to the file at path.
+        """
+        if path in self.pending:
+            self.pending[path][1] += text
+        else:
+            self.pending[path] = ['a', text, False]
+        self._schedule()
+
+    def _schedule(self):
+        """
+        Starts the delayed flush if one is not already
+        waiting. Outside of a running event loop, such as
+        before the bot has started, writes happen right away.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_sync()
+            return
+
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        """
+        Waits out the coalescing window, then flushes. Writes
+        requested while a flush is running find this task
+        still running, so it keeps going until none are left.
+        """
+        while self.pending:
+            await asyncio.sleep(self.delay)
+            await self.flush()
+
+    async def flush(self):
+        """
+        Hands every pending write to the worker thread
+        and waits for them to reach the disk.
+        """
+        batch, self.pending = self.pending, {}
+        if batch:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._write_batch, batch)
+
+    def flush_sync(self):
+        """
+        Writes every pending write from the calling thread.
+        """
+        batch, self.pending = self.pending, {}
+        if batch:
+            self.executor.submit(self._write_batch, batch).result()
+
+    @staticmethod
+    def _write_batch(batch):
+        """
+        Runs on the worker thread and performs each write in order.
+        """
+        for path, (mode, text, backup) in batch.items():
+            # Encoded once here, so the metric counts the bytes that actually reach the disk
+            data = text.encode('utf-8') if isinstance(text, str) else text
+            metrics.count('file_bytes_written_total', len(data), mode=mode)
+            with metrics.timer('file_write_seconds', mode=mode):
+                if mode == 'a':
+                    with open(path, 'ab') as f:
+                        f.write(data)
+                        f.flush()
+                        os.fsync(f.fileno())
+                else:
+                    AsyncFileWriter.atomic_write(path, data, backup)
+
+    @staticmethod
+    def atomic_write(path, text, backup=True):
+        """
+        Replaces the file at path with text so that a crash
+        at any point leaves either the old or the new file
+        on disk, never a partially written one. The
+        contents may be text or bytes.
+        """
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb' if isinstance(text, bytes) else 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Keep the last complete version around in case the new one is ever lost
+        if backup and os.path.exists(path):
+            os.replace(path, f"{path}.bak")
+        os.replace(temp_path, path)
+
+        # Sync the directory so the renames themselves survive a power loss
+        if hasattr(os, 'O_DIRECTORY'):
+            dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    @staticmethod
+    def read_json(path, default=None):
+        """
+        LOAD json data from path, falling back on the .bak
+        backup if the file is missing or unreadable. Returns
+        default if neither holds valid json.
+        """
+        for candidate in (path, f"{path}.bak"):
+            if not os.path.exists(candidate):
+                continue
+            try:
+                with open(candidate, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                print(f"Could not read {candidate}, it is missing or corrupted.")
+                continue
+            if candidate != path:
+                print(f"Recovered {path} from its backup {candidate}.")
+            return data
+        return default
+
+    async def close(self):
+        """
+        Flushes anything still pending and stops the
+        worker thread. Used when the bot shuts down.
+        """
+        if self.flush_task is not None and not self.flush_task.done():
+            self.flush_task.cancel()
+        await self.flush()
+        self.executor.shutdown(wait=True)
+
+class JsonStorage:
+    """
+    Default storage backend that keeps the ladder
+    in teams.json, matches.json and state.json.
+
+    Changes are appended to a write-ahead event log
+    which is replayed on top of the json files at
+    startup and folded back into them once
+    compact_every events have been written.
+    """
+    def __init__(self, teams_file, matches_file, state_file, events_file, compact_every=500):
+        self.TEAMS_FILE = teams_file
+        self.MATCHES_FILE = matches_file
+        self.STATE_FILE = state_file
+        self.EVENTS_FILE = events_file
+        self.compact_every = compact_every
+        self.events_since_compaction = 0
+
+        # Every save goes through the writer so disk I/O stays off the event loop
+        self.writer = AsyncFileWriter()
+
+    def has_data(self) -> bool:
+        """
+        Checks if any of the json files exist yet.
+        """
+        return any(os.path.exists(path) for path in (self.TEAMS_FILE, self.MATCHES_FILE, self.STATE_FILE))
+
+    def load_teams(self):
+        """
+        LOAD data from teams.json and replay events.log on top of it
+        """
+        teams = AsyncFileWriter.read_json(self.TEAMS_FILE, {})
+        self._replay_event_log('teams', teams)
+        return teams
+
+    def load_matches(self):
+        """
+        LOAD data from matches.json and replay events.log on top of it
+        """
+        matches = AsyncFileWriter.read_json(self.MATCHES_FILE, {})
+        self.events_since_compaction = self._replay_event_log('matches', matches)
+        return matches
+
+    def load_state(self):
+        """
+        LOAD data from state.json
+        """
+        return AsyncFileWriter.read_json(self.STATE_FILE)
+
+    def save_teams(self, teams):
+        """
+        SAVE data to teams.json
+        """
+        self.writer.write(self.TEAMS_FILE, json.dumps(teams))
+
+    def save_matches(self, matches):
+        """
+        SAVE data to matches.json
+        """
+        self.writer.write(self.MATCHES_FILE, json.dumps(matches))
+
+    def save_state(self, state):
+        """
+        SAVE to state.json
+        """
+        self.writer.write(self.STATE_FILE, json.dumps(state))
+
+    def record_event(self, event) -> bool:
+        """
+        APPEND an event to events.log
+
+        Returns True once enough events have been written
+        that the log should be compacted into a snapshot.
+        """
+        self.writer.append(self.EVENTS_FILE, json.dumps(event) + '\n')
+        self.events_since_compaction += 1
+        return self.events_since_compaction >= self.compact_every
+
+    def _replay_event_log(self, section, data):
+        """
+        REPLAY events.log on top of the loaded teams or matches,
+        depending on the section given. Returns the number of
+        events found in the log.
+
+        A partially written last line from a crash is cut
+        off the file first, so the next event appended after
+        it starts on a line of its own.
+        """
+        if not os.path.exists(self.EVENTS_FILE):
+            return 0
+        self._truncate_torn_tail()
+
+        count = 0
+        with open(self.EVENTS_FILE, 'r') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Skipping unreadable event in {self.EVENTS_FILE}.")
+                    continue
+                count += 1
+                data.update(event.get(section, {}))
+                for key in event.get(f'removed_{section}', []):
+                    data.pop(key, None)
+        return count
+
+    def _truncate_torn_tail(self, chunk_size=4096):
+        """
+        Cuts events.log back to the end of its last complete
+        line if a crash left a partially written line after it.
+        """
+        with open(self.EVENTS_FILE, 'r+b') as f:
+            end = f.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                start = max(0, position - chunk_size)
+                f.seek(start)
+                chunk = f.read(position - start)
+                newline = chunk.rfind(b'\n')
+                if newline != -1:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position == end:
+                return
+            f.truncate(position)
+            f.flush()
+            os.fsync(f.fileno())
+        print(f"Removed a partially written event from the end of {self.EVENTS_FILE}.")
+
+    def compact(self, teams, matches):
+        """
+        Writes a full snapshot of teams.json and matches.json,
+        then truncates events.log since every event in it is
+        now part of the snapshot.
+        """
+        self.save_teams(teams)
+        self.save_matches(matches)
+        self.writer.write(self.EVENTS_FILE, '', backup=False)
+        self.events_since_compaction = 0
+
+    async def flush(self):
+        """
+        Waits until every pending write is on disk.
+        """
+        await self.writer.flush()
+
+    async def close(self):
+        """
+        Flushes every pending write to disk.
+        """
+        await self.writer.close()
+
+class SqliteStorage:
+    """
+    Storage backend that keeps the ladder in a SQLite
+    database, for ladders too large to rewrite as json.
+
+    Teams are indexed by name, rank and member ID, and
+    each event is applied as a single transaction so a
+    reported result updates every affected row at once.
+    Writes run on a background thread like AsyncFileWriter.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS teams (
+            name TEXT PRIMARY KEY,
+            rank INTEGER,
+            wins INTEGER NOT NULL DEFAULT 0,
+            losses INTEGER NOT NULL DEFAULT 0,
+            extra TEXT
+        );
+        CREATE INDEX IF NOT EXISTS teams_rank ON teams (rank);
+        CREATE TABLE IF NOT EXISTS team_members (
+            team_name TEXT NOT NULL REFERENCES teams (name) ON DELETE CASCADE,
+            member_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (team_name, member_id)
+        );
+        CREATE INDEX IF NOT EXISTS team_members_member ON team_members (member_id);
+        CREATE TABLE IF NOT EXISTS matches (
+            match_id TEXT PRIMARY KEY,
+            challenger TEXT NOT NULL,
+            challenged TEXT NOT NULL,
+            status TEXT,
+            extra TEXT
+        );
+        CREATE TABLE IF NOT EXISTS state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    # Keys stored in their own columns, anything else is kept as json in the extra column
+    TEAM_COLUMNS = ('members', 'rank', 'wins', 'losses')
+    MATCH_COLUMNS = ('challenger', 'challenged', 'status')
+
+    def __init__(self, database_file):
+        self.DATABASE_FILE = database_file
+
+        # The connection is only ever used by one thread at a time, either at load or by the executor
+        self.connection = sqlite3.connect(database_file, check_same_thread=False)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(self.SCHEMA)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ladderbot-sqlite')
+        self.pending = []
+
+    def has_data(self) -> bool:
+        """
+        Checks if the database holds any ladder data yet.
+        """
+        for table in ('teams', 'matches', 'state'):
+            if self.connection.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                return True
+        return False
+
+    def migrate_from_json(self, json_storage):
+        """
+        One-shot copy of everything in the json files
+        (including unreplayed events) into the database.
+        """
+        teams = json_storage.load_teams()
+        matches = json_storage.load_matches()
+        state = json_storage.load_state()
+        with self.connection:
+            self._write_snapshot(self._team_rows(teams), self._match_rows(matches))
+            if state is not None:
+                self._write_state(state)
+        print(f"Migrated {len(teams)} teams and {len(matches)} matches from json into {self.DATABASE_FILE}.")
+
+    def load_teams(self):
+        """
+        LOAD every team and its members from the database
+        """
+        teams = {}
+        for name, rank, wins, losses, extra in self.connection.execute(
+                "SELECT name, rank, wins, losses, extra FROM teams ORDER BY rank"):
+            teams[name] = {'members': [], 'rank': rank, 'wins': wins, 'losses': losses}
+            if extra:
+                teams[name].update(json.loads(extra))
+        for team_name, member_id in self.connection.execute(
+                "SELECT team_name, member_id FROM team_members ORDER BY team_name, position"):
+            teams[team_name]['members'].append(member_id)
+        return teams
+
+    def load_matches(self):
+        """
+        LOAD every match from the database
+        """
+        matches = {}
+        for match_id, challenger, challenged, status, extra in self.connection.execute(
+                "SELECT match_id, challenger, challenged, status, extra FROM matches"):
+            matches[match_id] = {'challenger': challenger, 'challenged': challenged, 'status': status}
+            if extra:
+                matches[match_id].update(json.loads(extra))
+        return matches
+
+    def load_state(self):
+        """
+        LOAD the state from the database
+        """
+        rows = self.connection.execute("SELECT key, value FROM state").fetchall()
+        if not rows:
+            return None
+        return {key: json.loads(value) for key, value in rows}
+
+    def save_teams(self, teams):
+        """
+        SAVE every team, replacing what is in the database
+        """
+        self._submit(self._replace_teams, self._team_rows(teams))
+
+    def save_matches(self, matches):
+        """
+        SAVE every match, replacing what is in the database
+        """
+        self._submit(self._replace_matches, self._match_rows(matches))
+
+    def save_state(self, state):
+        """
+        SAVE the state to the database
+        """
+        self._submit(self._write_state, dict(state))
+
+    def record_event(self, event) -> bool:
+        """
+        Applies the rows touched by an event in one transaction.
+        The database never needs compacting so this returns False.
+        """
+        team_rows = self._team_rows(event.get('teams', {}))
+        match_rows = self._match_rows(event.get('matches', {}))
+        removed_teams = list(event.get('removed_teams', []))
+        removed_matches = list(event.get('removed_matches', []))
+        self._submit(self._apply_event, team_rows, removed_teams, match_rows, removed_matches)
+        return False
+
+    def compact(self, teams, matches):
+        """
+        Replaces every team and match in a single transaction.
+        """
+        self._submit(self._write_snapshot, self._team_rows(teams), self._match_rows(matches))
+
+    def _team_rows(self, teams):
+        """
+        Converts teams into rows on the event loop, so the
+        worker thread never reads data that is still changing.
+        """
+        rows = []
+        for name, data in teams.items():
+            extra = {key: value for key, value in data.items() if key not in self.TEAM_COLUMNS}
+            rows.append((name, data['rank'], data['wins'], data['losses'],
+                         json.dumps(extra) if extra else None, list(data['members'])))
+        return rows
+
+    def _match_rows(self, matches):
+        """
+        Converts matches into rows on the event loop.
+        """
+        rows = []
+        for match_id, data in matches.items():
+            extra = {key: value for key, value in data.items() if key not in self.MATCH_COLUMNS}
+            rows.append((match_id, data['challenger'], data['challenged'], data.get('status'),
+                         json.dumps(extra) if extra else None))
+        return rows
+
+    def _submit(self, function, *args):
+        """
+        Queues a transaction on the worker thread. Outside of
+        a running event loop the transaction runs right away.
+        """
+        def transaction():
+            with metrics.timer('sqlite_transaction_seconds', transaction=function.__name__.lstrip('_')), self.connection:
+                function(*args)
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.executor.submit(transaction).result()
+            return
+        self.pending.append(self.executor.submit(transaction))
+        self.pending = [future for future in self.pending if not future.done()]
+
+    def _upsert_teams(self, team_rows):
+        """
+        Inserts or updates teams along with their member rows.
+        """
+        for name, rank, wins, losses, extra, members in team_rows:
+            self.connection.execute(
+                "INSERT INTO teams (name, rank, wins, losses, extra) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET rank = excluded.rank, wins = excluded.wins, "
+                "losses = excluded.losses, extra = excluded.extra",
+                (name, rank, wins, losses, extra))
+            self.connection.execute("DELETE FROM team_members WHERE team_name = ?", (name,))
+            self.connection.executemany(
+                "INSERT INTO team_members (team_name, member_id, position) VALUES (?, ?, ?)",
+                [(name, member_id, position) for position, member_id in enumerate(members)])
+
+    def _upsert_matches(self, match_rows):
+        """
+        Inserts or replaces match rows.
+        """
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO matches (match_id, challenger, challenged, status, extra) VALUES (?, ?, ?, ?, ?)",
+            match_rows)
+
+    def _apply_event(self, team_rows, removed_teams, match_rows, removed_matches):
+        """
+        Runs on the worker thread and applies one event's rows.
+        """
+        self.connection.executemany("DELETE FROM teams WHERE name = ?", [(name,) for name in removed_teams])
+        self._upsert_teams(team_rows)
+        self.connection.executemany("DELETE FROM matches WHERE match_id = ?", [(match_id,) for match_id in removed_matches])
+        self._upsert_matches(match_rows)
+
+    def _replace_teams(self, team_rows):
+        """
+        Replaces every team row.
+        """
+        self.connection.execute("DELETE FROM teams")
+        self._upsert_teams(team_rows)
+
+    def _replace_matches(self, match_rows):
+        """
+        Replaces every match row.
+        """
+        self.connection.execute("DELETE FROM matches")
+        self._upsert_matches(match_rows)
+
+    def _write_snapshot(self, team_rows, match_rows):
+        """
+        Replaces every team and match row.
+        """
+        self._replace_teams(team_rows)
+        self._replace_matches(match_rows)
+
+    def _write_state(self, state):
+        """
+        Replaces every state row.
+        """
+        self.connection.execute("DELETE FROM state")
+        self.connection.executemany(
+            "INSERT INTO state (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in state.items()])
+
+    async def flush(self):
+        """
+        Waits until every queued transaction is committed.
+        """
+        pending, self.pending = self.pending, []
+        for future in pending:
+            await asyncio.wrap_future(future)
+
+    async def close(self):
+        """
+        Waits for every queued transaction and closes the database.
+        """
+        await self.flush()
+        self.executor.shutdown(wait=True)
+        self.connection.close()
+
+class MatchHistory:
+    """
+    Append-only history of every match result reported on a
+    ladder, kept in its own SQLite database so it is never
+    loaded into memory and is not cleared by end_ladder.
+
+    Results are indexed by team and by pair of teams in the
+    order they were reported, so the latest results of a team
+    or between two teams are a single index range scan.
+    Writes and queries run in order on one background thread,
+    so a query always sees every result reported before it.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS results (
+            id INTEGER PRIMARY KEY,
+            time REAL NOT NULL,
+            match_id TEXT,
+            challenger TEXT NOT NULL,
+            challenged TEXT NOT NULL,
+            winner TEXT NOT NULL,
+            loser TEXT NOT NULL,
+            winner_rank INTEGER,
+            loser_rank INTEGER,
+            first_team TEXT NOT NULL,
+            second_team TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS results_pair ON results (first_team, second_team, id);
+        CREATE TABLE IF NOT EXISTS team_results (
+            team TEXT NOT NULL,
+            result_id INTEGER NOT NULL,
+            PRIMARY KEY (team, result_id)
+        ) WITHOUT ROWID;
+    """
+
+    # Columns returned for every result by the queries
+    RESULT_COLUMNS = ('time', 'challenger', 'challenged', 'winner', 'loser', 'winner_rank', 'loser_rank')
+
+    def __init__(self, database_file):
+        self.DATABASE_FILE = database_file
+
+        # The connection is only ever used by one thread at a time, either at load or by the executor
+        self.connection = sqlite3.connect(database_file, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(self.SCHEMA)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ladderbot-history')
+        self.pending = []
+
+    def record(self, match_id, challenger, challenged, winner, loser, winner_rank, loser_rank):
+        """
+        APPEND the result of a match to the history
+        """
+        first_team, second_team = sorted((winner, loser))
+        row = (time.time(), match_id, challenger, challenged, winner, loser, winner_rank, loser_rank, first_team, second_team)
+
+        def transaction():
+            with metrics.timer('sqlite_transaction_seconds', transaction='record_result'), self.connection:
+                self._insert_result(row)
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.executor.submit(transaction).result()
+            return
+        self.pending.append(self.executor.submit(transaction))
+        self.pending = [future for future in self.pending if not future.done()]
+
+    def _insert_result(self, row):
+        """
+        Inserts a result and indexes it under both of its teams.
+        """
+        result_id = self.connection.execute(
+            "INSERT INTO results (time, match_id, challenger, challenged, winner, loser, "
+            "winner_rank, loser_rank, first_team, second_team) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row).lastrowid
+        self.connection.executemany(
+            "INSERT INTO team_results (team, result_id) VALUES (?, ?)",
+            [(row[4], result_id), (row[5], result_id)])
+
+    async def team_results(self, team_name, limit=10):
+        """
+        Returns the latest results of a team, newest first.
+        """
+        return await self._query(
+            "SELECT r.time, r.challenger, r.challenged, r.winner, r.loser, r.winner_rank, r.loser_rank "
+            "FROM team_results t JOIN results r ON r.id = t.result_id "
+            "WHERE t.team = ? ORDER BY t.result_id DESC LIMIT ?", (team_name, limit))
+
+    async def head_to_head(self, team_a, team_b, limit=10):
+        """
+        Returns the number of wins of each team against the
+        other and their latest results, newest first.
+        """
+        first_team, second_team = sorted((team_a, team_b))
+        results = await self._query(
+            "SELECT time, challenger, challenged, winner, loser, winner_rank, loser_rank FROM results "
+            "WHERE first_team = ? AND second_team = ? ORDER BY id DESC LIMIT ?", (first_team, second_team, limit))
+        wins = {team_a: 0, team_b: 0}
+        for winner, count in await self._query(
+                "SELECT winner, COUNT(*) FROM results WHERE first_team = ? AND second_team = ? GROUP BY winner",
+                (first_team, second_team), as_dicts=False):
+            wins[winner] = count
+        return wins, results
+
+    async def last_result_id(self):
+        """
+        Returns the ID of the latest result, or 0 if there is none.
+        """
+        rows = await self._query("SELECT MAX(id) FROM results", (), as_dicts=False)
+        return rows[0][0] or 0
+
+    async def results_between(self, first_result_id, last_result_id):
+        """
+        Returns every result with an ID in the given range, oldest first.
+        """
+        return await self._query(
+            "SELECT time, challenger, challenged, winner, loser, winner_rank, loser_rank FROM results "
+            "WHERE id BETWEEN ? AND ? ORDER BY id", (first_result_id, last_result_id))
+
+    async def _query(self, sql, parameters, as_dicts=True):
+        """
+        Runs a query on the history thread after every
+        result that was recorded before it.
+        """
+        def query():
+            rows = self.connection.execute(sql, parameters).fetchall()
+            return [dict(zip(self.RESULT_COLUMNS, row)) for row in rows] if as_dicts else rows
+
+        with metrics.timer('sqlite_transaction_seconds', transaction='history_query'):
+            return await asyncio.get_running_loop().run_in_executor(self.executor, query)
+
+    async def close(self):
+        """
+        Waits for every queued result and closes the database.
+        """
+        pending, self.pending = self.pending, []
+        for future in pending:
+            await asyncio.wrap_future(future)
+        self.executor.shutdown(wait=True)
+        self.connection.close()
+
+class SeasonArchive:
+    """
+    Archive of the finished seasons of a ladder.
+
+    end_ladder writes each season's final teams and open
+    matches to one gzip compressed file, and its results
+    to another, so the standings can be read without the
+    results. Only the small index of seasons is kept in
+    memory, a season's file is read from disk when it is
+    asked for and dropped again afterwards.
+    """
+    # Version of the season file format, stored in every season file
+    FORMAT_VERSION = 1
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.INDEX_FILE = os.path.join(directory, 'index.json')
+
+        # One entry per archived season, oldest first
+        self.seasons = AsyncFileWriter.read_json(self.INDEX_FILE, [])
+
+    def get(self, season):
+        """
+        Returns the index entry of a season, or None if it was never archived.
+        """
+        for entry in self.seasons:
+            if entry['season'] == season:
+                return entry
+        return None
+
+    async def archive(self, teams, matches, results, first_result_id, last_result_id):
+        """
+        Writes a season file and adds the season to the index.
+        teams are (team name, team data) pairs in rank order.
+        Returns the index entry of the new season.
+        """
+        season = self.seasons[-1]['season'] + 1 if self.seasons else 1
+        ended = time.time()
+        file_name = f"season_{season}.json.gz"
+        results_file_name = f"season_{season}_results.json.gz"
+        data = {
+            'version': self.FORMAT_VERSION,
+            'season': season,
+            'ended': ended,
+            'teams': [{'team_name': team_name, **team_data} for team_name, team_data in teams],
+            'matches': matches
+        }
+        results_data = {
+            'version': self.FORMAT_VERSION,
+            'season': season,
+            'results': results
+        }
+        entry = {
+            'season': season,
+            'ended': ended,
+            'file': file_name,
+            'results_file': results_file_name,
+            'teams': len(teams),
+            'top_teams': [team_name for team_name, team_data in teams[:3]],
+            'first_result_id': first_result_id,
+            'last_result_id': last_result_id
+        }
+
+        # Compress and write on a worker thread, the season files go first so the index never points at a missing file
+        index = [*self.seasons, entry]
+        files = {file_name: data, results_file_name: results_data}
+        await asyncio.get_running_loop().run_in_executor(None, self._write, files, index)
+        self.seasons = index
+        return entry
+
+    def _write(self, files, index):
+        """
+        Runs on a worker thread and writes the season files and the new index.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with metrics.timer('file_write_seconds', mode='season'):
+            for file_name, data in files.items():
+                AsyncFileWriter.atomic_write(os.path.join(self.directory, file_name),
+                                             gzip.compress(json.dumps(data).encode('utf-8')), backup=False)
+            AsyncFileWriter.atomic_write(self.INDEX_FILE, json.dumps(index))
+
+    @staticmethod
+    def result_count(entry):
+        """
+        Returns the number of results of a season, taken
+        from the result IDs in its index entry.
+        """
+        return entry['last_result_id'] - entry['first_result_id'] + 1
+
+    async def load(self, season):
+        """
+        LOAD the final teams and open matches of an archived
+        season from its file, or None if the season was never
+        archived. Raises ValueError if the file was written
+        by a newer format version.
+        """
+        entry = self.get(season)
+        if entry is None:
+            return None
+        return await asyncio.get_running_loop().run_in_executor(None, self._read, entry['file'])
+
+    def _read(self, file_name):
+        """
+        Runs on a worker thread and reads a season file from disk.
+        """
+        with gzip.open(os.path.join(self.directory, file_name), 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version', 1) > self.FORMAT_VERSION:
+            raise ValueError(f"{file_name} was written by a newer version of the bot.")
+        return data
+
+class MemberNameCache:
+    """
+    Caches member display names for the standings boards.
+
+    Names come from the gateway member cache when possible,
+    so most lookups never touch the REST API. Members that
+    are not cached by the gateway are fetched concurrently,
+    a few at a time. Entries expire after ttl seconds and
+    the least recently used ones are evicted past max_size.
+    """
+    def __init__(self, bot, ttl=600, max_size=10000, max_concurrent_fetches=5):
+        self.bot = bot
+        self.ttl = ttl
+        self.max_size = max_size
+        self.fetch_semaphore = asyncio.Semaphore(max_concurrent_fetches)
+
+        # (guild ID, member ID) -> (display name, expiry time), least recently used first
+        self.entries = OrderedDict()
+
+        # Member ID -> set of guild IDs it is cached under, used for invalidation
+        self.keys_by_member = {}
+
+    def _get_cached(self, key):
+        """
+        Returns the cached name for key if it has not expired.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        name, expires_at = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return name
+
+    def _store(self, key, name):
+        """
+        Caches a name and evicts the least recently used entries if full.
+        """
+        self.entries[key] = (name, time.monotonic() + self.ttl)
+        self.entries.move_to_end(key)
+        self.keys_by_member.setdefault(key[1], set()).add(key[0])
+        while len(self.entries) > self.max_size:
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        """
+        Drops a single entry from the cache.
+        """
+        self.entries.pop(key, None)
+        guild_ids = self.keys_by_member.get(key[1])
+        if guild_ids is not None:
+            guild_ids.discard(key[0])
+            if not guild_ids:
+                del self.keys_by_member[key[1]]
+
+    def invalidate(self, member_id):
+        """
+        Forgets every cached name of the given member, used
+        when Discord reports their name or nickname changed.
+        """
+        for guild_id in list(self.keys_by_member.get(member_id, ())):
+            self._remove((guild_id, member_id))
+
+    async def _fetch_name(self, member_id):
+        """
+        Fetches a single user over the REST API, limited
+        by the semaphore. Returns (name, cacheable).
+        """
+        async with self.fetch_semaphore:
+            try:
+                with metrics.timer('discord_request_seconds', request='fetch_user'):
+                    user = await self.bot.fetch_user(member_id)
+                return user.display_name, True
+            except discord.NotFound:
+                return "Unknown User", True
+            except discord.HTTPException:
+                return "Fetch Error", False
+
+    async def resolve(self, member_ids, guild=None):
+        """
+        Returns a dictionary of member ID -> display name
+        for every member ID given.
+        """
+        guild_id = guild.id if guild is not None else None
+        names = {}
+        to_fetch = []
+        for member_id in set(member_ids):
+            key = (guild_id, member_id)
+            name = self._get_cached(key)
+            if name is None:
+                # Prefer the gateway caches, they do not cost an API call
+                member = guild.get_member(member_id) if guild is not None else None
+                if member is None:
+                    member = self.bot.get_user(member_id)
+                if member is not None:
+                    name = member.display_name
+                    self._store(key, name)
+            if name is None:
+                to_fetch.append(member_id)
+            else:
+                names[member_id] = name
+
+        # Fetch everyone else concurrently instead of one round trip at a time
+        results = await asyncio.gather(*(self._fetch_name(member_id) for member_id in to_fetch))
+        for member_id, (name, cacheable) in zip(to_fetch, results):
+            names[member_id] = name
+            if cacheable:
+                self._store((guild_id, member_id), name)
+        return names
+
+class PagedBoard:
+    """
+    A dynamically updating board made up of one or
+    more messages in a channel, used for the Standings
+    and Challenges boards.
+
+    Discord limits a message to 2000 characters, so the
+    board is split into pages with one message per page.
+    Only pages whose text changed are edited, and messages
+    are sent or deleted as the board grows or shrinks.
+    """
+    # Leaves room for the time stamp added to the last page
+    PAGE_LIMIT = 1900
+
+    def __init__(self, message_ids=None):
+        # IDs of the board's messages in page order, saved in state.json
+        self.message_ids = list(message_ids or [])
+
+        # Cached message for each page, None until it has been edited or sent
+        self.messages = [None] * len(self.message_ids)
+
+        # Channel ID and page texts (without time stamp) the board last showed
+        self.channel_id = None
+        self.pages = None
+
+        # Number of requests the board has made to Discord, used to budget board refreshes
+        self.requests = 0
+
+    @staticmethod
+    def paginate(entries, separator='\n', limit=PAGE_LIMIT):
+        """
+        Joins entries with separator into as few pages
+        as possible without any page going over limit.
+        An entry is never split across two pages.
+        """
+        pages = []
+        current = ''
+        for entry in entries:
+            entry = entry[:limit]
+            if current and len(current) + len(separator) + len(entry) > limit:
+                pages.append(current)
+                current = entry
+            else:
+                current = f"{current}{separator}{entry}" if current else entry
+        pages.append(current)
+        return pages
+
+    def is_showing(self, channel, pages) -> bool:
+        """
+        Checks if the board already shows these pages in the channel.
+        """
+        return self.channel_id == channel.id and self.pages == pages
+
+    def forget(self):
+        """
+        Stops tracking the board's messages, used when
+        the board is moved to another channel or cleared.
+        """
+        self.message_ids = []
+        self.messages = []
+        self.channel_id = None
+        self.pages = None
+
+    async def update(self, channel, pages, footer='', adopt_from=None):
+        """
+        Pushes the pages to the channel, with footer added
+        to the last page. Returns True if the board's
+        message IDs changed and need to be saved.
+
+        With no known messages and adopt_from set to the
+        bot's user ID, the latest message in the channel is
+        reused as the first page if the bot wrote it, like
+        the single message board did.
+
+        Only messages the board sent or adopted are ever
+        deleted. A page that can no longer be edited is
+        dropped from the board and sent again.
+        """
+        message_ids_before = list(self.message_ids)
+
+        # Page texts the channel currently shows, if known
+        shown_pages = self.pages if self.channel_id == channel.id else None
+
+        if not self.message_ids and adopt_from is not None:
+            self.requests += 1
+            async for message in channel.history(limit=1):
+                if message.author.id == adopt_from:
+                    self.message_ids.append(message.id)
+                    self.messages.append(message)
+
+        last_index = len(pages) - 1
+        for index, page in enumerate(pages):
+            content = f"{page}{footer}" if index == last_index else page
+
+            if index < len(self.message_ids):
+                # Skip pages that have not changed, the last page always changes with the footer
+                if index != last_index and shown_pages is not None and index < len(shown_pages) and shown_pages[index] == page:
+                    continue
+
+                message = self.messages[index] or channel.get_partial_message(self.message_ids[index])
+                try:
+                    self.requests += 1
+                    self.messages[index] = await message.edit(content=content)
+                    continue
+                except (discord.NotFound, discord.Forbidden):
+                    # The page is gone or no longer ours to edit, so stop tracking it without
+                    # deleting it, and resend it and every page after it so they stay in order
+                    await self._delete_pages(channel, index + 1)
+                    del self.message_ids[index:]
+                    del self.messages[index:]
+
+            self.requests += 1
+            message = await channel.send(content=content)
+            self.message_ids.append(message.id)
+            self.messages.append(message)
+
+        # Remove pages left over from when the board was longer
+        await self._delete_pages(channel, len(pages))
+
+        self.channel_id = channel.id
+        self.pages = list(pages)
+        return self.message_ids != message_ids_before
+
+    async def _delete_pages(self, channel, start):
+        """
+        Deletes every page message from index start onwards.
+        """
+        for index in range(start, len(self.message_ids)):
+            message = self.messages[index] or channel.get_partial_message(self.message_ids[index])
+            try:
+                self.requests += 1
+                await message.delete()
+            except (discord.NotFound, discord.Forbidden):
+                pass
+        del self.message_ids[start:]
+        del self.messages[start:]
+
+class BoardScheduler:
+    """
+    Refreshes the boards of every ladder from a single task.
+
+    Each board is a job with its own interval, kept in a
+    priority queue ordered by when it is next due. Refreshes
+    share one budget of requests to Discord, so many boards
+    coming due at once are spread out instead of all being
+    edited in the same moment.
+    """
+    def __init__(self, requests_per_second=2.0, burst=10):
+        # Budget of requests to Discord, refilled at requests_per_second up to burst
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.budget = burst
+        self.budget_updated = None
+
+        # key -> (refresh coroutine function, interval in seconds)
+        self.jobs = {}
+
+        # key -> loop time the job is next due, and a heap of (due, order, key).
+        # Heap entries that no longer match self.due are stale and skipped
+        self.due = {}
+        self.heap = []
+        self.order = 0
+
+        self.wakeup = None
+        self.task = None
+
+    def add(self, key, refresh, interval):
+        """
+        Adds or replaces a job. refresh is awaited right
+        away and then every interval seconds, and may return
+        how many requests it made to Discord.
+        """
+        self.jobs[key] = (refresh, interval)
+        self.request(key, 0)
+
+    def remove(self, key):
+        """
+        Removes a job, a refresh already running still finishes.
+        """
+        self.jobs.pop(key, None)
+        self.due.pop(key, None)
+
+    def request(self, key, delay):
+        """
+        Makes a job run within delay seconds, unless
+        it is already due sooner.
+        """
+        if key not in self.jobs:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        due = loop.time() + delay
+        if due < self.due.get(key, float('inf')):
+            self._set_due(key, due)
+            self._start(loop)
+            self.wakeup.set()
+
+    def _set_due(self, key, due):
+        self.due[key] = due
+        self.order += 1
+        heapq.heappush(self.heap, (due, self.order, key))
+
+    def _start(self, loop):
+        if self.task is None or self.task.done():
+            self.wakeup = asyncio.Event()
+            self.task = loop.create_task(self._run())
+
+    async def _run(self):
+        """
+        Waits for the next job to come due, waits for
+        enough budget, then runs it and schedules it again.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            self.wakeup.clear()
+
+            # Skip entries of removed or rescheduled jobs
+            while self.heap and self.due.get(self.heap[0][2]) != self.heap[0][0]:
+                heapq.heappop(self.heap)
+
+            if not self.heap:
+                await self.wakeup.wait()
+                continue
+
+            due, _, key = self.heap[0]
+            if due > loop.time():
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), due - loop.time())
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._wait_for_budget(loop)
+            if self.due.get(key) != due:
+                continue
+
+            # The job is no longer due while it runs, so a request made during the refresh schedules another one
+            heapq.heappop(self.heap)
+            del self.due[key]
+            refresh, interval = self.jobs[key]
+            try:
+                requests = await refresh()
+            except Exception as e:
+                print(f"Board refresh {key} failed: {e}")
+                requests = 1
+            self.budget -= 1 if requests is None else requests
+
+            if key in self.jobs:
+                self._set_due(key, min(self.due.get(key, float('inf')), loop.time() + self.jobs[key][1]))
+
+    async def _wait_for_budget(self, loop):
+        """
+        Refills the request budget for the time passed and
+        waits until at least one request can be made.
+        """
+        while True:
+            now = loop.time()
+            if self.budget_updated is not None:
+                self.budget = min(self.burst, self.budget + (now - self.budget_updated) * self.requests_per_second)
+            self.budget_updated = now
+            if self.budget >= 1:
+                return
+            await asyncio.sleep((1 - self.budget) / self.requests_per_second)
+
+    async def close(self):
+        """
+        Stops the scheduler, dropping every job.
+        """
+        self.jobs.clear()
+        self.due.clear()
+        self.heap.clear()
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+class NotificationDispatcher:
+    """
+    Sends direct messages to members in the background
+    so commands never wait on them.
+
+    Messages are queued and sent by a fixed number of
+    workers, which bounds how many are in flight at once.
+    discord.py already waits on Discord's per-route rate
+    limits, so only failed sends (such as a 429 that
+    got through or a server error) are retried, with
+    exponential backoff. Members that cannot be messaged
+    are recorded in failures instead of being retried.
+    """
+    def __init__(self, bot, max_concurrent=5, max_retries=3, base_delay=1.0, max_failures_kept=500):
+        self.bot = bot
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+
+        # Queue of (member ID, message) waiting to be sent
+        self.queue = asyncio.Queue()
+        self.workers = []
+
+        # Most recent delivery failures, oldest first
+        self.failures = deque(maxlen=max_failures_kept)
+
+    def notify(self, member_ids, content):
+        """
+        Queues a direct message to every member ID given
+        and returns right away.
+        """
+        for member_id in member_ids:
+            self.queue.put_nowait((member_id, content))
+        self._start_workers()
+
+    def _start_workers(self):
+        """
+        Starts the workers the first time something is queued.
+        """
+        if self.workers:
+            return
+        loop = asyncio.get_running_loop()
+        self.workers = [loop.create_task(self._worker()) for _ in range(self.max_concurrent)]
+
+    async def _worker(self):
+        """
+        Sends queued messages one at a time, forever.
+        """
+        while True:
+            member_id, content = await self.queue.get()
+            try:
+                await self._deliver(member_id, content)
+            except Exception as e:
+                self._record_failure(member_id, f"Unexpected error: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, member_id, content):
+        """
+        Sends a single message, retrying with backoff
+        when Discord fails the request.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                member = self.bot.get_user(member_id)
+                if member is None:
+                    with metrics.timer('discord_request_seconds', request='fetch_user'):
+                        member = await self.bot.fetch_user(member_id)
+                with metrics.timer('discord_request_seconds', request='send_dm'):
+                    await member.send(content)
+                return
+            except discord.Forbidden:
+                self._record_failure(member_id, "Forbidden, they may have direct messages disabled")
+                return
+            except discord.NotFound:
+                self._record_failure(member_id, "Member not found")
+                return
+            except discord.HTTPException as e:
+                if attempt == self.max_retries:
+                    self._record_failure(member_id, f"Gave up after {attempt + 1} attempts: {e}")
+                    return
+
+                # Wait as long as Discord asked for if it did, otherwise back off exponentially
+                retry_after = getattr(e, 'retry_after', None)
+                await asyncio.sleep(retry_after or self.base_delay * 2 ** attempt)
+
+    def _record_failure(self, member_id, reason):
+        """
+        Keeps a record of a message that could not be delivered.
+        """
+        self.failures.append({'member_id': member_id, 'reason': reason, 'time': time.time()})
+        print(f"Could not send a message to member ID {member_id}: {reason}")
+
+    async def close(self, timeout=10):
+        """
+        Gives queued messages up to timeout seconds to
+        be sent, then stops the workers.
+        """
+        if self.workers:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                print(f"{self.queue.qsize()} notifications were not sent before shutting down.")
+        for worker in self.workers:
+            worker.cancel()
+        self.workers = []
+
+class LadderLocks:
+    """
+    Locks that keep commands from changing the same
+    teams at the same time across await points.
+
+    Each team has its own lock, so results of unrelated
+    matches can be handled in parallel. Anything that
+    shifts ranks also takes the ladder lock, since a
+    rank shift moves teams outside the ones it locked.
+    Team locks are always taken in sorted order and
+    before the ladder lock, so two commands can never
+    end up waiting on each other.
+    """
+    def __init__(self):
+        # Team name -> [lock, number of commands holding or waiting on it]
+        self.team_locks = {}
+        self.ladder_lock = asyncio.Lock()
+        # Number of commands inside or waiting to get inside hold()
+        self.users = 0
+
+    @asynccontextmanager
+    async def hold(self, *team_names, ladder=False):
+        """
+        Holds the locks of the given teams, and of the
+        whole ladder if ladder is True, for the duration
+        of an async with block.
+
+        A team lock is dropped again once no command holds
+        or waits on it, so locks of teams that were only
+        used once do not pile up.
+        """
+        team_names = sorted(set(team_names))
+        self.users += 1
+        for team_name in team_names:
+            self.team_locks.setdefault(team_name, [asyncio.Lock(), 0])[1] += 1
+        try:
+            async with AsyncExitStack() as stack:
+                for team_name in team_names:
+                    await stack.enter_async_context(self.team_locks[team_name][0])
+                if ladder:
+                    await stack.enter_async_context(self.ladder_lock)
+                yield
+        finally:
+            self.users -= 1
+            for team_name in team_names:
+                entry = self.team_locks[team_name]
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self.team_locks[team_name]
+
+    def in_use(self) -> bool:
+        """
+        Returns True while any command holds or waits on
+        a lock of the ladder.
+        """
+        return self.users > 0
+
+class EloRatings:
+    """
+    Elo ratings of the teams on a ladder.
+
+    Ratings are updated one result at a time as results
+    are reported. A full recompute from the match history
+    replays every result, and with NumPy installed it
+    updates every match of a round at once: matches are
+    grouped into rounds in which no team plays twice, so
+    the outcome is the same as replaying them one by one.
+    """
+    def __init__(self, start=RATING_START, k_factor=RATING_K_FACTOR):
+        self.start = start
+        self.k_factor = k_factor
+
+    def expected(self, rating, opponent_rating):
+        """
+        Returns the chance of a team beating its opponent.
+        """
+        return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+    def update(self, winner_rating, loser_rating):
+        """
+        Returns the new ratings of the winner and the loser of a match.
+        """
+        change = self.k_factor * (1 - self.expected(winner_rating, loser_rating))
+        return winner_rating + change, loser_rating - change
+
+    def recompute(self, results):
+        """
+        Replays (winner, loser) results in order with every
+        team starting from the start rating. Returns a dict
+        of team name -> rating.
+        """
+        if numpy is None:
+            ratings = {}
+            for winner, loser in results:
+                ratings[winner], ratings[loser] = self.update(ratings.get(winner, self.start), ratings.get(loser, self.start))
+            return ratings
+
+        # Number every team, then place each match in the round after the last match of either team
+        team_ids = {}
+        last_round = []
+        winner_ids = []
+        loser_ids = []
+        rounds = []
+        for winner, loser in results:
+            winner_id = team_ids.get(winner)
+            if winner_id is None:
+                winner_id = team_ids[winner] = len(last_round)
+                last_round.append(-1)
+            loser_id = team_ids.get(loser)
+            if loser_id is None:
+                loser_id = team_ids[loser] = len(last_round)
+                last_round.append(-1)
+            round_index = last_round[winner_id] if last_round[winner_id] > last_round[loser_id] else last_round[loser_id]
+            round_index += 1
+            last_round[winner_id] = last_round[loser_id] = round_index
+            winner_ids.append(winner_id)
+            loser_ids.append(loser_id)
+            rounds.append(round_index)
+
+        # Sort the matches by round, keeping their order, and update each round at once
+        order = numpy.argsort(numpy.array(rounds), kind='stable')
+        winner_ids = numpy.array(winner_ids)[order]
+        loser_ids = numpy.array(loser_ids)[order]
+        round_ends = numpy.cumsum(numpy.bincount(rounds)) if rounds else []
+        ratings = numpy.full(len(team_ids), float(self.start))
+        round_start = 0
+        for round_end in round_ends:
+            winners = winner_ids[round_start:round_end]
+            losers = loser_ids[round_start:round_end]
+            change = self.k_factor * (1 - 1 / (1 + 10 ** ((ratings[losers] - ratings[winners]) / 400)))
+            ratings[winners] += change
+            ratings[losers] -= change
+            round_start = round_end
+        return {team_name: float(ratings[team_id]) for team_name, team_id in team_ids.items()}
+
+class Team:
+    """
+    A team on the ladder.
+
+    Uses __slots__ instead of a dict per team to keep
+    large ladders small in memory, and is stored as the
+    same json object older versions saved for each team.
+    """
+    __slots__ = ('members', 'rank', 'wins', 'losses', 'rating', 'extra')
+
+    # Keys of the json object that map to attributes, anything else is kept in extra
+    FIELDS = ('members', 'rank', 'wins', 'losses', 'rating')
+
+    def __init__(self, members, rank=None, wins=0, losses=0, rating=RATING_START, extra=None):
+        self.members = members
+        self.rank = rank
+        self.wins = wins
+        self.losses = losses
+        self.rating = rating
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates a team from its json object.
+        """
+        extra = {key: value for key, value in data.items() if key not in cls.FIELDS}
+        return cls(data['members'], data.get('rank'), data.get('wins', 0), data.get('losses', 0),
+                   data.get('rating', RATING_START), extra or None)
+
+    def to_dict(self):
+        """
+        Returns the json object the team is stored as.
+        """
+        data = {'members': self.members, 'rank': self.rank, 'wins': self.wins, 'losses': self.losses, 'rating': self.rating}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __eq__(self, other):
+        return isinstance(other, Team) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"Team({self.to_dict()!r})"
+
+class Match:
+    """
+    A challenge between two teams, stored as the same
+    json object older versions saved for each match.
+    """
+    __slots__ = ('challenger', 'challenged', 'status', 'deadline', 'extra')
+
+    # Keys of the json object that map to attributes, anything else is kept in extra
+    FIELDS = ('challenger', 'challenged', 'status', 'deadline')
+
+    def __init__(self, challenger, challenged, status='pending', deadline=None, extra=None):
+        self.challenger = challenger
+        self.challenged = challenged
+        self.status = status
+
+        # Time the match expires at, in seconds since the epoch, or None if it never does
+        self.deadline = deadline
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates a match from its json object.
+        """
+        extra = {key: value for key, value in data.items() if key not in cls.FIELDS}
+        return cls(data['challenger'], data['challenged'], data.get('status', 'pending'), data.get('deadline'), extra or None)
+
+    def to_dict(self):
+        """
+        Returns the json object the match is stored as.
+        """
+        data = {'challenger': self.challenger, 'challenged': self.challenged, 'status': self.status}
+        if self.deadline is not None:
+            data['deadline'] = self.deadline
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __eq__(self, other):
+        return isinstance(other, Match) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"Match({self.to_dict()!r})"
+
+class Ladder:
+    """
+    The teams, matches, boards and storage of one ladder.
+
+    Each guild has its own ladder, and can make more
+    named ladders with !use_ladder. Every ladder keeps
+    its files in its own folder so they never mix.
+    """
+    def __init__(self, bot, directory, name_cache, notifier, scheduler):
+        """
+        Initializes the teams, matches, channels, and file paths of a ladder.
+        Loads data from the teams.json, matches.json, and state.json files
+        in the given folder.
+        """
+        self.bot = bot
+        self.directory = directory
+
+        # Variables to hold the data from teams.json and matches.json
+        self.teams = {}
+        self.matches = {}
+
+        # Reverse index of member ID -> team name, rebuilt from teams.json on load
+        self.member_index = {}
+
+        # Index of team name -> match ID for every team involved in an active match
+        self.team_match_index = {}
+
+        # Heap of (deadline, match ID) of every match that can expire, rebuilt from the matches on load.
+        # Entries of matches that were reported or canceled since are skipped when they reach the top
+        self.deadlines = []
+
+        # Timer set for the earliest deadline, so matches never need to be polled,
+        # and the task it started to expire the matches that are due
+        self.expiry_timer = None
+        self.expiry_task = None
+
+        # Called with the earliest deadline, or None, whenever the timer is set again.
+        # The registry uses it to load the ladder when a deadline is due while it is not in memory
+        self.deadline_listener = None
+
+        # Team names ordered by rank (index 0 is rank 1). Each team's 'rank'
+        # field is kept in sync with this list and acts as the team -> rank map
+        self.rank_order = []
+
+        # Lines of the "every challenge available" view, built once after each change to the ladder
+        self.available_challenges = None
+
+        # Rendered standings line of every team, stored with the values it was
+        # rendered from so only teams whose rank, record or names changed are redone
+        self.standings_lines = {}
+
+        # Variables for the designated channels for seperate Standings and Challenges data
+        self.standings_channel_id = None
+        self.challenges_channel_id = None
+
+        # Boards for the seperate Standings and Challenges channels, their message IDs are pulled from state.json
+        self.standings_board = PagedBoard()
+        self.challenges_board = PagedBoard()
+
+        # Name cache, notification dispatcher and board scheduler shared by every ladder
+        self.name_cache = name_cache
+        self.notifier = notifier
+        self.scheduler = scheduler
+
+        # Per-team and ladder-wide locks held by commands while they change the ladder
+        self.locks = LadderLocks()
+
+        # Flags set by every change to a board that has a channel, cleared once it is refreshed.
+        # Changes are batched for BOARD_REFRESH_DELAY seconds before the scheduler pushes one refresh
+        self.standings_dirty = False
+        self.challenges_dirty = False
+        self.BOARD_REFRESH_DELAY = 2
+
+        # Seconds between the periodic refreshes of each board. Changes refresh
+        # the boards right away, so these are only a safety net
+        self.BOARD_INTERVALS = {'standings': 300, 'challenges': 300}
+
+        # Flag for whether or not the ladder is currently running, pulled from state.json
+        self.ladder_running = False
+
+        # When a command last used this ladder, idle ladders are dropped from memory
+        self.last_used = time.monotonic()
+
+        # File paths
+        os.makedirs(directory, exist_ok=True)
+        self.TEAMS_FILE = os.path.join(directory, 'teams.json')
+        self.MATCHES_FILE = os.path.join(directory, 'matches.json')
+        self.STATE_FILE = os.path.join(directory, 'state.json')
+
+        # Write-ahead event log that every command appends to when using the json storage
+        self.EVENTS_FILE = os.path.join(directory, 'events.log')
+
+        # SQLite database used instead of the files above when STORAGE_BACKEND is 'sqlite'
+        self.DATABASE_FILE = os.path.join(directory, 'ladderbot.db')
+
+        # SQLite database holding the result of every match ever reported, with either backend
+        self.HISTORY_FILE = os.path.join(directory, 'history.db')
+
+        # Folder holding the archive of every finished season
+        self.SEASONS_DIRECTORY = os.path.join(directory, 'seasons')
+
+        # Storage backend every load and save goes through
+        self.storage = self._create_storage(STORAGE_BACKEND)
+
+        # Match history, which is only queried on demand and never loaded into memory
+        self.history = MatchHistory(self.HISTORY_FILE)
+
+        # Archived seasons, only their index is read until a season is asked for
+        self.seasons = SeasonArchive(self.SEASONS_DIRECTORY)
+
+        # Elo ratings updated with every reported result
+        self.ratings = EloRatings()
+
+        # Load data from storage, this happens once when the ladder is first used so it is done directly
+        self.load_teams()
+        self.load_matches()
+        self.load_state()
+
+    def _create_storage(self, backend):
+        """
+        Creates the storage backend chosen by STORAGE_BACKEND.
+
+        When switching to 'sqlite' with an empty database,
+        the existing .json data is migrated into it once.
+        """
+        json_storage = JsonStorage(self.TEAMS_FILE, self.MATCHES_FILE, self.STATE_FILE, self.EVENTS_FILE)
+        if backend == 'json':
+            return json_storage
+        if backend == 'sqlite':
+            sqlite_storage = SqliteStorage(self.DATABASE_FILE)
+            if not sqlite_storage.has_data() and json_storage.has_data():
+                sqlite_storage.migrate_from_json(json_storage)
+            return sqlite_storage
+        raise ValueError(f"Unknown storage backend '{backend}', use 'json' or 'sqlite'.")
+
+    def load_teams(self):
+        """
+        LOAD data from storage
+        """
+        self.teams = {team_name: Team.from_dict(team_data) for team_name, team_data in self.storage.load_teams().items()}
+        self._rebuild_member_index()
+        self._rebuild_rank_order()
+
+    def load_matches(self):
+        """
+        LOAD data from storage
+        """
+        self.matches = {match_id: Match.from_dict(match_data) for match_id, match_data in self.storage.load_matches().items()}
+        self._rebuild_match_index()
+        self._rebuild_deadlines()
+
+    def load_state(self):
+        """
+        LOAD data from storage
+        """
+        state = self.storage.load_state()
+        if state is not None:
+            self.standings_channel_id = state.get('standings_channel_id', None)
+            self.challenges_channel_id = state.get('challenges_channel_id', None)
+            self.standings_board = PagedBoard(self._load_board_message_ids(state, 'standings'))
+            self.challenges_board = PagedBoard(self._load_board_message_ids(state, 'challenges'))
+            self.ladder_running = state.get('ladder_running', False)
+
+    def _load_board_message_ids(self, state, board):
+        """
+        Returns the saved message IDs of a board, also
+        accepting the single message ID older versions saved.
+        """
+        message_ids = state.get(f'{board}_message_ids')
+        if message_ids is None and state.get(f'{board}_message_id') is not None:
+            message_ids = [state[f'{board}_message_id']]
+        return message_ids or []
+
+    def save_state(self):
+        """
+        SAVE state to storage
+        """
+        state = {
+            'standings_channel_id': self.standings_channel_id,
+            'challenges_channel_id': self.challenges_channel_id,
+            'standings_message_ids': self.standings_board.message_ids,
+            'challenges_message_ids': self.challenges_board.message_ids,
+            'ladder_running': self.ladder_running
+        }
+        metrics.count('saves_total', what='state')
+        self.storage.save_state(state)
+
+    def _team_dicts(self):
+        """
+        Returns every team as the json object it is stored as.
+        """
+        return {team_name: team.to_dict() for team_name, team in self.teams.items()}
+
+    def _match_dicts(self):
+        """
+        Returns every match as the json object it is stored as.
+        """
+        return {match_id: match.to_dict() for match_id, match in self.matches.items()}
+
+    def _log_event(self, event_type, teams=None, removed_teams=None, matches=None, removed_matches=None):
+        """
+        Records a change to the ladder in storage.
+
+        Every event stores the new state of each team and
+        match it touched, so the json storage can replay
+        its log in order and the SQLite storage can update
+        just those rows in one transaction.
+        """
+        event = {'type': event_type}
+        if teams:
+            event['teams'] = {team_name: self.teams[team_name].to_dict() for team_name in teams}
+        if removed_teams:
+            event['removed_teams'] = list(removed_teams)
+        if matches:
+            event['matches'] = {match_id: self.matches[match_id].to_dict() for match_id in matches}
+        if removed_matches:
+            event['removed_matches'] = list(removed_matches)
+
+        metrics.count('events_total', type=event_type)
+        self.available_challenges = None
+        if self.storage.record_event(event):
+            self.compact_event_log()
+
+        # Flag the boards showing what changed
+        if teams or removed_teams:
+            self.mark_standings_dirty()
+        if matches or removed_matches:
+            self.mark_challenges_dirty()
+
+    def compact_event_log(self):
+        """
+        Writes a full snapshot of the teams and matches to storage.
+        With the json storage this also truncates events.log.
+        """
+        metrics.count('saves_total', what='snapshot')
+        self.available_challenges = None
+        self.storage.compact(self._team_dicts(), self._match_dicts())
+        self.mark_standings_dirty()
+        self.mark_challenges_dirty()
+
+    def mark_standings_dirty(self):
+        """
+        Flags the standings board as out of date and
+        asks the scheduler to refresh it shortly, so a
+        burst of changes only leads to a single refresh.
+        """
+        if self.standings_channel_id:
+            self.standings_dirty = True
+            self.scheduler.request(self._board_job('standings'), self.BOARD_REFRESH_DELAY)
+
+    def mark_challenges_dirty(self):
+        """
+        Flags the challenges board as out of date and
+        asks the scheduler to refresh it shortly, so a
+        burst of changes only leads to a single refresh.
+        """
+        if self.challenges_channel_id:
+            self.challenges_dirty = True
+            self.scheduler.request(self._board_job('challenges'), self.BOARD_REFRESH_DELAY)
+
+    def _board_job(self, board):
+        """
+        Returns the scheduler key of one of this ladder's boards.
+        """
+        return (self.directory, board)
+
+    def schedule_board(self, board):
+        """
+        Adds the 'standings' or 'challenges' board to the
+        board scheduler, which refreshes it right away and
+        then every BOARD_INTERVALS[board] seconds.
+        """
+        refresh = self.refresh_standings_board if board == 'standings' else self.refresh_challenges_board
+        self.scheduler.add(self._board_job(board), refresh, self.BOARD_INTERVALS[board])
+
+    def unschedule_board(self, board):
+        """
+        Stops the scheduled refreshes of a board.
+        """
+        self.scheduler.remove(self._board_job(board))
+        if board == 'standings':
+            self.standings_dirty = False
+        else:
+            self.challenges_dirty = False
+
+    async def refresh_standings_board(self):
+        """
+        Refreshes the standings board in its channel. Run
+        by the board scheduler, returns the number of
+        requests it made to Discord.
+        """
+        self.standings_dirty = False
+        channel = self.bot.get_channel(self.standings_channel_id) if self.standings_channel_id else None
+        if channel is None:
+            return 0
+
+        requests_before = self.standings_board.requests
+        try:
+            with metrics.timer('board_update_seconds', board='standings'):
+                await self.update_standings_message(channel)
+        except discord.HTTPException as e:
+            print(f"Could not refresh the Standings board: {e}")
+        requests = self.standings_board.requests - requests_before
+        metrics.count('discord_requests_total', requests, request='standings_board')
+        return requests
+
+    async def refresh_challenges_board(self):
+        """
+        Refreshes the challenges board in its channel. Run
+        by the board scheduler, returns the number of
+        requests it made to Discord.
+        """
+        self.challenges_dirty = False
+        channel = self.bot.get_channel(self.challenges_channel_id) if self.challenges_channel_id else None
+        if channel is None:
+            return 0
+
+        requests_before = self.challenges_board.requests
+        try:
+            with metrics.timer('board_update_seconds', board='challenges'):
+                await self.update_challenges_message(channel)
+        except discord.HTTPException as e:
+            print(f"Could not refresh the Challenges board: {e}")
+        requests = self.challenges_board.requests - requests_before
+        metrics.count('discord_requests_total', requests, request='challenges_board')
+        return requests
+
+    def normalize_ranks(self):
+        """
+        Helper method used to make sure the ranks
+        are still contiguous after removing teams,
+        setting ranks, etc.
+
+        The rank order list keeps ranks contiguous on
+        every change, so this is only an O(1) check of
+        its ends. The full rebuild only happens if the
+        check ever fails.
+        """
+        if len(self.rank_order) != len(self.teams):
+            self._rebuild_rank_order()
+            return
+        if self.rank_order and (self.teams[self.rank_order[0]].rank != 1 or
+                                self.teams[self.rank_order[-1]].rank != len(self.rank_order)):
+            self._rebuild_rank_order()
+
+    def _rebuild_rank_order(self):
+        """
+        Rebuilds the rank order list from scratch by
+        sorting the teams by their stored rank, then
+        renumbers every team so the ranks are contiguous.
+
+        Teams without a rank are placed at the bottom.
+        """
+        sorted_teams = sorted(self.teams.items(), key=lambda x: (x[1].rank is None, x[1].rank or 0))
+        self.rank_order = [team_name for team_name, team_data in sorted_teams]
+        self._renumber_ranks(0, len(self.rank_order))
+
+    def _renumber_ranks(self, start, end):
+        """
+        Writes the rank of every team in the rank order
+        list between index start and end (exclusive) back
+        into the teams data. Returns the affected team names.
+        """
+        affected = self.rank_order[start:end]
+        for index, team_name in enumerate(affected, start=start + 1):
+            self.teams[team_name].rank = index
+        return affected
+
+    def _append_to_ladder(self, team_name):
+        """
+        Places a newly registered team in the
+        last most place of the ladder.
+        """
+        self.rank_order.append(team_name)
+        self.teams[team_name].rank = len(self.rank_order)
+
+    def _remove_from_ladder(self, team_name):
+        """
+        Takes a team out of the ladder and moves every
+        team ranked below it up by one.
+        """
+        index = self.teams[team_name].rank - 1
+        del self.rank_order[index]
+        return self._renumber_ranks(index, len(self.rank_order))
+
+    def _move_team_to_rank(self, team_name, rank):
+        """
+        Moves a team to the given rank and shifts only the
+        teams between its old and new rank by one place.
+        Returns the names of every team whose rank changed.
+        """
+        old_index = self.teams[team_name].rank - 1
+        new_index = rank - 1
+        self.rank_order.insert(new_index, self.rank_order.pop(old_index))
+        return self._renumber_ranks(min(old_index, new_index), max(old_index, new_index) + 1)
+
+    def _rebuild_member_index(self):
+        """
+        Rebuilds the member ID -> team name index
+        from scratch using the current teams data.
+        """
+        self.member_index = {}
+        for team_name, team_data in self.teams.items():
+            for member_id in team_data.members:
+                self.member_index[member_id] = team_name
+
+    def _index_team_members(self, team_name):
+        """
+        Adds every member of the given team to the member index.
+        """
+        for member_id in self.teams[team_name].members:
+            self.member_index[member_id] = team_name
+
+    def _unindex_team_members(self, team_name):
+        """
+        Removes every member of the given team from the member index.
+        """
+        for member_id in self.teams[team_name].members:
+            if self.member_index.get(member_id) == team_name:
+                del self.member_index[member_id]
+
+    def challengeable_teams(self, team_name):
+        """
+        Returns the teams the given team can challenge right
+        now: the teams up to two ranks above it that are not
+        in a match. Only those two places of the rank order
+        list are looked at, however large the ladder is.
+        """
+        team_data = self.teams.get(team_name)
+        if team_data is None or team_data.rank is None or self._is_team_in_match(team_name):
+            return []
+        window = self.rank_order[max(0, team_data.rank - 3):team_data.rank - 1]
+        return [other_team for other_team in window if not self._is_team_in_match(other_team)]
+
+    def challenge_suggestion(self, team_name):
+        """
+        Returns a sentence telling which teams the given
+        team can challenge, added to rejected challenges.
+        """
+        teams = self.challengeable_teams(team_name)
+        if not teams:
+            return f"Team {team_name} cannot challenge any team right now."
+        return f"Team {team_name} can challenge: {', '.join(teams)}."
+
+    def build_available_challenges(self):
+        """
+        Returns one line for every team that can challenge
+        another team right now, listing who it can challenge.
+
+        The lines are built once and reused until the next
+        change to the ladder, so asking for them again is free.
+        """
+        if self.available_challenges is None:
+            self.available_challenges = []
+            for team_name in self.rank_order:
+                teams = self.challengeable_teams(team_name)
+                if teams:
+                    self.available_challenges.append(f"{team_name} can challenge: {', '.join(teams)}")
+        return self.available_challenges
+
+    def get_team_of_member(self, member_id: int):
+        """
+        Returns the name of the team the given member
+        ID belongs to, or None if they are not on a team.
+        """
+        return self.member_index.get(member_id)
+
+    def _is_member_already_registered(self, member_id: int) -> bool:
+        """
+        Checks if a player is already a member of any registered team.
+        """
+        return member_id in self.member_index
+
+    def _rebuild_match_index(self):
+        """
+        Rebuilds the team name -> match ID index
+        from scratch using the current matches data.
+        """
+        self.team_match_index = {}
+        for match_id, match in self.matches.items():
+            self.team_match_index[match.challenger] = match_id
+            self.team_match_index[match.challenged] = match_id
+
+    def _add_match(self, match_id, challenger_team, team_name):
+        """
+        Creates a new pending match and indexes both teams involved.
+        """
+        deadline = time.time() + CHALLENGE_DEADLINE if CHALLENGE_DEADLINE is not None else None
+        self.matches[match_id] = Match(challenger_team, team_name, deadline=deadline)
+        self.team_match_index[challenger_team] = match_id
+        self.team_match_index[team_name] = match_id
+
+        # Only a match that expires before every other one needs the timer moved
+        if deadline is not None:
+            heapq.heappush(self.deadlines, (deadline, match_id))
+            if self.expiry_timer is None or self.deadlines[0][1] == match_id:
+                self.schedule_expiry()
+
+    def _cancel_match(self, match_id):
+        """
+        Internal method used by cancel_challenge, admin_cancel_challenge
+        and challenge expiry to cancel a match.
+
+        Must be called while holding the locks of both teams.
+        """
+        self._remove_match(match_id)
+        self._log_event('challenge_canceled', removed_matches=[match_id])
+
+    def _rebuild_deadlines(self):
+        """
+        Rebuilds the deadline heap from the deadline stored
+        with every match. Challenges issued before deadlines
+        existed are given one counted from now.
+        """
+        self.deadlines = []
+        if CHALLENGE_DEADLINE is None:
+            return
+
+        undated = [match_id for match_id, match in self.matches.items() if match.deadline is None]
+        for match_id in undated:
+            self.matches[match_id].deadline = time.time() + CHALLENGE_DEADLINE
+        self.deadlines = [(match.deadline, match_id) for match_id, match in self.matches.items()]
+        heapq.heapify(self.deadlines)
+
+        # Store the new deadlines so they are not pushed back again on every restart
+        if undated:
+            self._log_event('challenge_deadlines_set', matches=undated)
+
+    def _is_current_deadline(self, deadline, match_id):
+        """
+        Checks if a deadline heap entry still belongs to an open match.
+        """
+        match = self.matches.get(match_id)
+        return match is not None and match.deadline == deadline
+
+    def schedule_expiry(self):
+        """
+        Sets the expiry timer for the earliest deadline,
+        dropping heap entries of matches that are gone.
+        """
+        while self.deadlines and not self._is_current_deadline(*self.deadlines[0]):
+            heapq.heappop(self.deadlines)
+        if self.deadline_listener is not None:
+            self.deadline_listener(self.deadlines[0][0] if self.deadlines else None)
+
+        if self.expiry_timer is not None:
+            self.expiry_timer.cancel()
+            self.expiry_timer = None
+        if not self.deadlines:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        delay = max(0, self.deadlines[0][0] - time.time())
+        self.expiry_timer = loop.call_later(delay, self._start_expiry_task)
+
+    def _start_expiry_task(self):
+        """
+        Starts expiring the matches that are due. Run by the
+        expiry timer, the task is kept so it is not dropped
+        while it runs.
+        """
+        self.expiry_task = asyncio.get_running_loop().create_task(self.expire_matches())
+
+    async def expire_matches(self):
+        """
+        Expires every match whose deadline has passed, then
+        sets the timer for the next deadline. Run by the
+        expiry timer.
+        """
+        self.expiry_timer = None
+        while self.deadlines and self.deadlines[0][0] <= time.time():
+            deadline, match_id = heapq.heappop(self.deadlines)
+            if self._is_current_deadline(deadline, match_id):
+                # One match failing to expire should not keep the others from expiring
+                try:
+                    await self._expire_match(match_id, deadline)
+                except Exception as e:
+                    print(f"Could not expire match {match_id} in {self.directory}: {e}")
+        if self.expiry_timer is None:
+            self.schedule_expiry()
+
+    async def _expire_match(self, match_id, deadline):
+        """
+        Cancels an expired match, or gives the win to the
+        challenger if EXPIRED_CHALLENGE_ACTION is 'forfeit',
+        and lets both teams know.
+        """
+        match = self.matches[match_id]
+        forfeit = EXPIRED_CHALLENGE_ACTION == 'forfeit'
+
+        # Lock both teams, and the whole ladder if the challenger wins since ranks will shift
+        async with self.locks.hold(match.challenger, match.challenged, ladder=forfeit):
+            # The match may have been reported or canceled while waiting for the locks
+            if self.matches.get(match_id) is not match or match.deadline != deadline:
+                return
+
+            if forfeit:
+                self._report_result(match_id, match.challenger)
+                content = f"The challenge between Team '{match.challenger}' and Team '{match.challenged}' has expired. Team '{match.challenged}' forfeits and Team '{match.challenger}' wins the match."
+            else:
+                self._cancel_match(match_id)
+                content = f"The challenge between Team '{match.challenger}' and Team '{match.challenged}' has expired without a result and has been canceled."
+
+        metrics.count('challenges_expired_total', action=EXPIRED_CHALLENGE_ACTION)
+        self.notify_team(match.challenger, content)
+        self.notify_team(match.challenged, content)
+
+    def _remove_match(self, match_id):
+        """
+        Deletes a match and removes both of its teams from the index.
+        """
+        match = self.matches.pop(match_id)
+        for team in (match.challenger, match.challenged):
+            if self.team_match_index.get(team) == match_id:
+                del self.team_match_index[team]
+
+    def get_match_of_team(self, team_name):
+        """
+        Returns a (match_id, match) tuple for the match the given
+        team is involved in, or (None, None) if it has no match.
+        """
+        match_id = self.team_match_index.get(team_name)
+        if match_id is None:
+            return None, None
+        return match_id, self.matches[match_id]
+
+    def _is_team_in_match(self, team_name) -> bool:
+        """
+        Checks if a team is currently involved in any match.
+        """
+        return team_name in self.team_match_index
+
+    def notify_team(self, team_name, content):
+        """
+        Internal method used to queue a direct message
+        to every member of a team. It returns right away
+        and the messages are sent in the background.
+
+        Used for challenge notifications and can be
+        used for any other team notification as well.
+        """
+        if team_name in self.teams:
+            self.notifier.notify(self.teams[team_name].members, content)
+
+    async def send_challenge_notification(self, challenger_team, team_name):
+        """
+        This internal method will be used in the challenge and 
+        admin_challenge methods to send a message to the members
+        of a challenged team notifying them they have been challenged.
+
+        It uses the challenger_team parameter to hold the challenger team name
+        to send in the message, and uses team_name to find all members on that team
+        and then send them the message
+        """
+        self.notify_team(team_name, f"Your team '{team_name}' has been challenged by Team '{challenger_team}'!")
+
+    def _report_result(self, match_id, winning_team):
+        """
+        Internal method used by report_win and admin_report_win
+        to apply the result of a match to the ladder.
+
+        Must be called while holding the locks of both teams,
+        and the ladder lock if the challenger won. Returns the
+        losing team and whether any ranks changed.
+        """
+        match = self.matches[match_id]
+
+        # Determine the loser team
+        loser_team = match.challenged if match.challenger == winning_team else match.challenger
+
+        # Holds every team whose rank changes from this result
+        moved_teams = []
+
+        # If the winning team was a challenger then rank changes need to occur
+        if winning_team == match.challenger:
+            # Challenger wins - winner team takes the loser's rank on the ladder,
+            # the loser and every team between them moves down one rank
+            losing_rank = self.teams[loser_team].rank
+            moved_teams = self._move_team_to_rank(winning_team, losing_rank)
+
+            # Normalize ranks for safe measure
+            self.normalize_ranks()
+
+        # Update wins and losses for both teams
+        self.teams[winning_team].wins += 1
+        self.teams[loser_team].losses += 1
+
+        # Update the ratings of both teams from this result alone
+        self.teams[winning_team].rating, self.teams[loser_team].rating = self.ratings.update(
+            self.teams[winning_team].rating, self.teams[loser_team].rating)
+
+        # Add the result to the match history
+        self.history.record(match_id, match.challenger, match.challenged, winning_team, loser_team,
+                            self.teams[winning_team].rank, self.teams[loser_team].rank)
+
+        # Remove the match from matches.json, then log the result to events.log
+        self._remove_match(match_id)
+        self._log_event('result_reported', teams={winning_team, loser_team, *moved_teams}, removed_matches=[match_id])
+        return loser_team, bool(moved_teams)
+
+    def _build_challenges_entries(self):
+        """
+        Builds the list of challenge entries shown on
+        the challenges board, one entry per match.
+        """
+        # Format the list of current challenges
+        challenge_list = []
+        for match_id, match_info in self.matches.items():
+            challenger = match_info.challenger
+            challenged = match_info.challenged
+            entry = f"**Match ID**: {match_id}\n**Challenger**: {challenger}\n**Challenged**: {challenged}\n"
+            if match_info.deadline is not None:
+                entry += f"**Expires**: {time.strftime('%Y-%m-%d %H:%M', time.localtime(match_info.deadline))}\n"
+            challenge_list.append(entry)
+        return challenge_list
+
+    def _format_result(self, result):
+        """
+        Formats a result from the match history as one line.
+        """
+        readable_time = time.strftime('%Y-%m-%d %H:%M', time.localtime(result['time']))
+        line = f"{readable_time} - {result['winner']} beat {result['loser']}"
+        if result['winner'] == result['challenger']:
+            line += f" and took rank {result['winner_rank']}"
+        else:
+            line += " and defended their rank"
+        return line
+
+    def _add_time_stamp(self, text):
+        """
+        Appends a readable "Last updated" time stamp to a board's text.
+        """
+        # Create time stamp and format it to be readable
+        time_stamp = time.time()
+        readable_time_stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time_stamp))
+
+        # Join the board text to one long string and then append the time stamp to the end
+        return f"{text}\n\nLast updated: {readable_time_stamp}"
+
+    async def update_challenges_message(self, channel):
+        """
+        Internal method used to find and edit the
+        dynamically changing message in the challenges.
+
+        If no message exists, a new message is 
+        created in the designated channel
+
+        Nothing is edited if the challenges have not
+        changed since the board was last updated.
+        """
+        # Split the challenges into pages and stop if the board already shows them
+        challenges_pages = PagedBoard.paginate(self._build_challenges_entries())
+        if self.challenges_board.is_showing(channel, challenges_pages):
+            return
+
+        # Edit only the pages that changed, sending or deleting messages as the board grows or shrinks
+        if await self.challenges_board.update(channel, challenges_pages, self._add_time_stamp(''), adopt_from=getattr(self.bot.user, 'id', None)):
+            # Save the board message IDs so they can be reused after a restart
+            self.save_state()
+
+    async def initialize_challenges_message(self, channel):
+        """
+        Sends a new challenges board to the channel
+        and tracks it in our self.challenges_board that
+        was made with our class constructor.
+        """
+        self.challenges_board.forget()
+        challenges_pages = PagedBoard.paginate(["**Current Challenges:**", *self._build_challenges_entries()])
+        await self.challenges_board.update(channel, challenges_pages, self._add_time_stamp(''))
+        self.save_state()
+        return self.challenges_board.messages
+
+    async def generate_standings(self, guild=None):
+        """
+        Internal method used for the seperate
+        standings channel scoreboard.
+
+        Works just like post_standings, but adds
+        a time stamp and  returns everything back
+        into one long string.
+
+        Is also used when ending the ladder
+
+        The guild is used to look up member
+        nicknames from the gateway cache.
+        """
+        # Join the standings list into a string and append the time stamp
+        standings = "\n".join(await self._build_standings_lines(guild))
+        return self._add_time_stamp(standings)
+
+    async def _build_standings_lines(self, guild=None):
+        """
+        Builds the list of lines shown on the
+        standings board, one line per team.
+
+        Lines are cached per team, so after a result
+        only the teams whose rank or record changed
+        are formatted again.
+        """
+        # Look up the names of every member on the ladder at once, mostly from cache
+        names = await self.name_cache.resolve([member_id for team_name in self.rank_order for member_id in self.teams[team_name].members], guild)
+
+        # Drop the lines of teams that have left the ladder
+        if len(self.standings_lines) > len(self.teams):
+            self.standings_lines = {team_name: line for team_name, line in self.standings_lines.items() if team_name in self.teams}
+
+        # Variable to hold data before we join it into a string
+        standings_list = []
+
+        # Iterate through every team in rank order
+        for team_name in self.rank_order:
+            team_data = self.teams[team_name]
+            if team_data.rank is None:
+                continue
+
+            # Collect names of members on each team
+            member_names = tuple(names[member_id] for member_id in team_data.members)
+
+            # Reuse the line rendered last time unless something shown on it changed
+            rating = round(team_data.rating)
+            version = (team_data.rank, team_data.wins, team_data.losses, rating, member_names)
+            cached = self.standings_lines.get(team_name)
+            if cached is None or cached[0] != version:
+                # Format the team information into something kind of pretty
+                cached = (version, f"{team_data.rank}. {team_name} ({' - '.join(member_names)}) - W: {team_data.wins} L: {team_data.losses} - Rating: {rating}")
+                self.standings_lines[team_name] = cached
+            standings_list.append(cached[1])
+        return standings_list
+
+    async def update_standings_message(self, channel):
+        """
+        Internal method used to edit the scoreboard
+        that appears in the designated standings channel.
+
+        If no message exists to edit, a new message is
+        created in the designated standings channel.
+
+        Nothing is edited if the standings have not
+        changed since the board was last updated.
+        """
+        # Split the standings into pages and stop if the board already shows them
+        standings_pages = PagedBoard.paginate(await self._build_standings_lines(channel.guild))
+        if self.standings_board.is_showing(channel, standings_pages):
+            return
+
+        # Edit only the pages that changed, sending or deleting messages as the board grows or shrinks
+        if await self.standings_board.update(channel, standings_pages, self._add_time_stamp(''), adopt_from=getattr(self.bot.user, 'id', None)):
+            # Save the board message IDs so they can be reused after a restart
+            self.save_state()
+
+    async def initialize_standings_message(self, channel):
+        """
+        Sends a new standings board to the channel
+        and tracks it in our self.standings_board that
+        was made with our class constructor.
+        """
+        self.standings_board.forget()
+        standings_pages = PagedBoard.paginate(["**Current Standings:**", *await self._build_standings_lines(channel.guild)])
+        await self.standings_board.update(channel, standings_pages, self._add_time_stamp(''))
+        self.save_state()
+        return self.standings_board.messages
+
+    # Columns of the .csv files read by the team import and written by the team export
+    TEAM_FILE_COLUMNS = ('team_name', 'members', 'rank', 'wins', 'losses')
+
+    @staticmethod
+    def parse_team_file(filename, data):
+        """
+        Reads the teams out of an uploaded .csv or .json file.
+
+        A .csv file needs a header row with team_name and
+        members columns, members being member IDs or mentions
+        split by spaces. A .json file holds a list of objects
+        with the same keys, or one object of team name ->
+        member IDs. Any other column is ignored, so a file
+        made by export_teams can be imported again.
+
+        Returns a list of (team_name, member_ids) pairs and
+        raises ValueError if the file cannot be read.
+        """
+        text = data.decode('utf-8-sig')
+        if filename.lower().endswith('.json'):
+            content = json.loads(text)
+            if isinstance(content, dict):
+                rows = [{'team_name': team_name, 'members': members} for team_name, members in content.items()]
+            elif isinstance(content, list) and all(isinstance(row, dict) for row in content):
+                rows = content
+            else:
+                raise ValueError("The .json file must hold a list of teams or an object of team name -> member IDs.")
+        elif filename.lower().endswith('.csv'):
+            reader = csv.DictReader(io.StringIO(text))
+            if not reader.fieldnames or 'team_name' not in reader.fieldnames or 'members' not in reader.fieldnames:
+                raise ValueError("The .csv file needs a header row with team_name and members columns.")
+            rows = list(reader)
+        else:
+            raise ValueError("Please attach a .csv or .json file.")
+
+        teams = []
+        for row_number, row in enumerate(rows, start=1):
+            team_name = str(row.get('team_name') or '').strip()
+            members = row.get('members') or []
+            if isinstance(members, str):
+                members = members.split()
+            elif not isinstance(members, list):
+                raise ValueError(f"Team number {row_number} in the file ({team_name or 'no name'}) must have a list of member IDs as its members, not {members!r}.")
+
+            # Accept plain member IDs as well as mentions like <@123>
+            member_ids = []
+            for member in members:
+                match = re.fullmatch(r'<@!?(\d+)>|(\d+)', str(member).strip())
+                if match is None:
+                    raise ValueError(f"Team {team_name or '(no name)'} has a member that is not a member ID: {member}")
+                member_ids.append(int(match.group(1) or match.group(2)))
+            teams.append((team_name, member_ids))
+        return teams
+
+    def validate_team_import(self, new_teams):
+        """
+        Checks a batch of teams against the ladder and
+        against each other in a single pass, using the
+        member index instead of scanning every team.
+
+        Returns a list of problems, which is empty if the
+        whole batch can be registered.
+        """
+        problems = []
+        team_names = set()
+        batch_members = {}
+        for team_name, member_ids in new_teams:
+            if not team_name:
+                problems.append("A team in the file has no name.")
+                continue
+            if team_name in self.teams:
+                problems.append(f"Team {team_name} already exists.")
+            elif team_name in team_names:
+                problems.append(f"Team {team_name} is in the file more than once.")
+            team_names.add(team_name)
+
+            if not member_ids:
+                problems.append(f"Team {team_name} has no members.")
+            for member_id in member_ids:
+                if self._is_member_already_registered(member_id):
+                    problems.append(f"Member ID {member_id} of Team {team_name} is already apart of Team {self.member_index[member_id]}.")
+                elif batch_members.get(member_id) == team_name:
+                    problems.append(f"Member ID {member_id} is on Team {team_name} more than once.")
+                elif member_id in batch_members:
+                    problems.append(f"Member ID {member_id} is on both Team {batch_members[member_id]} and Team {team_name}.")
+                else:
+                    batch_members[member_id] = team_name
+        return problems
+
+    def import_teams(self, new_teams):
+        """
+        Registers a validated batch of teams at the bottom of
+        the ladder in the order given. The whole batch is
+        recorded as one event, so storage saves it in a
+        single write or transaction.
+        """
+        for team_name, member_ids in new_teams:
+            self.teams[team_name] = Team(member_ids)
+            self._index_team_members(team_name)
+            self._append_to_ladder(team_name)
+        self._log_event('teams_imported', teams=[team_name for team_name, member_ids in new_teams])
+
+    def export_teams(self, file_format='csv'):
+        """
+        Returns every team in rank order as the contents of
+        a .csv or .json file that parse_team_file can read.
+        """
+        rows = [(team_name, self.teams[team_name]) for team_name in self.rank_order]
+        if file_format == 'json':
+            return json.dumps([
+                {'team_name': team_name, 'members': team.members, 'rank': team.rank, 'wins': team.wins, 'losses': team.losses}
+                for team_name, team in rows
+            ], indent=2).encode('utf-8')
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.TEAM_FILE_COLUMNS)
+        writer.writerows((team_name, ' '.join(map(str, team.members)), team.rank, team.wins, team.losses) for team_name, team in rows)
+        return buffer.getvalue().encode('utf-8')
+
+    def _season_first_result_id(self):
+        """
+        Returns the ID of the first match history result
+        of the current season.
+        """
+        previous = self.seasons.seasons[-1] if self.seasons.seasons else None
+        return previous['last_result_id'] + 1 if previous else 1
+
+    async def recompute_ratings(self):
+        """
+        Recomputes the rating of every team by replaying
+        the results of the current season from the match
+        history. Returns the number of results replayed.
+        """
+        results = await self.history.results_between(self._season_first_result_id(), await self.history.last_result_id())
+        ratings = self.ratings.recompute([(result['winner'], result['loser']) for result in results])
+        for team_name, team_data in self.teams.items():
+            team_data.rating = ratings.get(team_name, self.ratings.start)
+        self._log_event('ratings_recomputed', teams=list(self.teams))
+        return len(results)
+
+    async def archive_season(self):
+        """
+        Archives the final teams, open matches and match
+        results of the season that is ending. Returns the
+        index entry of the archived season.
+        """
+        first_result_id = self._season_first_result_id()
+        last_result_id = await self.history.last_result_id()
+        results = await self.history.results_between(first_result_id, last_result_id)
+        teams = [(team_name, self.teams[team_name].to_dict()) for team_name in self.rank_order]
+        return await self.seasons.archive(teams, self._match_dicts(), results, first_result_id, last_result_id)
+
+    def start_board_updates(self):
+        """
+        Adds every board that has a channel set
+        to the board scheduler.
+        """
+        if self.standings_channel_id:
+            self.schedule_board('standings')
+        if self.challenges_channel_id:
+            self.schedule_board('challenges')
+
+    def is_busy(self) -> bool:
+        """
+        Checks if a command is still working on the
+        ladder or a board is waiting to be refreshed,
+        so it is not dropped from memory halfway through.
+        """
+        if self.locks.in_use():
+            return True
+        return self.standings_dirty or self.challenges_dirty
+
+    async def close(self):
+        """
+        Stops the board updates of the ladder and makes
+        sure every pending write reaches the disk.
+        """
+        self.scheduler.remove(self._board_job('standings'))
+        self.scheduler.remove(self._board_job('challenges'))
+        if self.expiry_timer is not None:
+            self.expiry_timer.cancel()
+            self.expiry_timer = None
+        if self.expiry_task is not None and not self.expiry_task.done():
+            self.expiry_task.cancel()
+            try:
+                await self.expiry_task
+            except asyncio.CancelledError:
+                pass
+        await self.storage.close()
+        await self.history.close()
+
+class LadderRegistry:
+    """
+    Every ladder hosted by the bot, keyed by guild
+    and ladder name.
+
+    A ladder is loaded from ladders/<guild ID>/<ladder name>/
+    the first time it is used, and saved and dropped from
+    memory again after idle_timeout seconds without use.
+
+    The earliest challenge deadline of every ladder is kept
+    in ladders/deadlines.json, so a ladder that is not in
+    memory is only loaded again once one of its challenges
+    is due to expire.
+    """
+    # Files older versions kept next to ladderbot2.py for their single ladder
+    LEGACY_FILES = ('teams.json', 'matches.json', 'state.json', 'events.log', 'ladderbot.db')
+
+    def __init__(self, bot, name_cache, notifier, scheduler, root='ladders', idle_timeout=1800):
+        self.bot = bot
+        self.name_cache = name_cache
+        self.notifier = notifier
+        self.scheduler = scheduler
+        self.root = root
+        self.idle_timeout = idle_timeout
+
+        # (guild ID, ladder name) -> Ladder for every ladder currently in memory
+        self.ladders = {}
+
+        # Ladders being saved as they are dropped, loading them again waits for this
+        self.closing = {}
+
+        # Ladders being loaded on a worker thread, every command using one at the same time waits for the same load
+        self.loading = {}
+
+        # guild ID -> {channel ID: ladder name} for channels set to a named ladder
+        self.channel_ladders = {}
+
+        # "<guild ID>/<ladder name>" -> earliest challenge deadline of every ladder with open
+        # challenges, read from DEADLINES_FILE the first time it is needed
+        self.DEADLINES_FILE = os.path.join(root, 'deadlines.json')
+        self.deadlines = None
+
+        # Timer set for the earliest deadline of a ladder that is not in memory,
+        # and the task it started to load the ladders that are due
+        self.expiry_timer = None
+        self.expiry_task = None
+
+        # Writes the files of the registry itself, like the deadline index
+        self.writer = AsyncFileWriter()
+
+    def directory_of(self, guild_id, ladder_name=DEFAULT_LADDER):
+        """
+        Returns the folder a ladder keeps its files in.
+        """
+        return os.path.join(self.root, str(guild_id), ladder_name)
+
+    async def get(self, guild_id, ladder_name=DEFAULT_LADDER):
+        """
+        Returns a ladder, loading it from storage
+        if it is not in memory yet.
+        """
+        key = (guild_id, ladder_name)
+
+        # Wait for the ladder to finish saving if it is being dropped right now
+        closing = self.closing.get(key)
+        if closing is not None:
+            await asyncio.shield(closing)
+
+        ladder = self.ladders.get(key)
+        if ladder is None:
+            loading = self.loading.get(key)
+            if loading is None:
+                self.loading[key] = loading = asyncio.ensure_future(self._load(key))
+
+            # Shielded so a command that is cancelled does not cancel the load for the others
+            ladder = await asyncio.shield(loading)
+        ladder.last_used = time.monotonic()
+        return ladder
+
+    async def _load(self, key):
+        """
+        Reads a ladder from its folder on a worker thread, so
+        a large ladder does not hold up other commands while
+        it loads, then starts its boards and expiry timer.
+        """
+        try:
+            ladder = await asyncio.get_running_loop().run_in_executor(None, self._read_ladder, *key)
+        finally:
+            del self.loading[key]
+
+        self.ladders[key] = ladder
+        ladder.deadline_listener = lambda deadline: self._note_deadline(key, deadline)
+        ladder.start_board_updates()
+        ladder.schedule_expiry()
+        return ladder
 
-from my_token import MY_DISCORD_TOKEN
+    def _read_ladder(self, guild_id, ladder_name):
+        """
+        Runs on a worker thread and creates the Ladder,
+        which reads every file it needs.
+        """
+        directory = self.directory_of(guild_id, ladder_name)
+        if ladder_name == DEFAULT_LADDER:
+            self._adopt_legacy_files(guild_id, directory)
+        with metrics.timer('ladder_load_seconds'):
+            return Ladder(self.bot, directory, self.name_cache, self.notifier, self.scheduler)
 
-"""
-"""
+    def loaded(self, guild_id=None):
+        """
+        Returns every ladder in memory, or only
+        those of one guild if guild_id is given.
+        """
+        return [ladder for (ladder_guild_id, _), ladder in self.ladders.items() if guild_id is None or ladder_guild_id == guild_id]
+
+    def ladder_names(self, guild_id):
+        """
+        Returns the names of every ladder a guild has.
+        """
+        guild_directory = os.path.join(self.root, str(guild_id))
+        names = {DEFAULT_LADDER, *self._channel_ladders(guild_id).values()}
+        if os.path.isdir(guild_directory):
+            names.update(name for name in os.listdir(guild_directory) if os.path.isdir(os.path.join(guild_directory, name)))
+        return sorted(names)
+
+    def ladder_name_of(self, guild_id, channel_id):
+        """
+        Returns the name of the ladder used by
+        commands called from the given channel.
+        """
+        return self._channel_ladders(guild_id).get(str(channel_id), DEFAULT_LADDER)
+
+    def set_channel_ladder(self, guild_id, channel_id, ladder_name):
+        """
+        Makes commands called from the given channel use
+        the named ladder, or the default ladder again.
+        """
+        channels = self._channel_ladders(guild_id)
+        if ladder_name == DEFAULT_LADDER:
+            channels.pop(str(channel_id), None)
+        else:
+            channels[str(channel_id)] = ladder_name
+
+        os.makedirs(os.path.join(self.root, str(guild_id)), exist_ok=True)
+        self.writer.write(os.path.join(self.root, str(guild_id), 'channels.json'), json.dumps(channels, indent=4))
+
+    def _channel_ladders(self, guild_id):
+        """
+        LOAD the channel -> ladder name map of a guild
+        """
+        if guild_id not in self.channel_ladders:
+            path = os.path.join(self.root, str(guild_id), 'channels.json')
+            self.channel_ladders[guild_id] = AsyncFileWriter.read_json(path, {})
+        return self.channel_ladders[guild_id]
+
+    def _adopt_legacy_files(self, guild_id, directory):
+        """
+        Moves the files of the single ladder older versions
+        kept next to ladderbot2.py into the folder of a guild's
+        default ladder. They go to the guild their board channels
+        are in, or to the first guild to use the bot if no board
+        channel was ever set.
+        """
+        if os.path.isdir(directory) or not any(os.path.exists(file_name) for file_name in self.LEGACY_FILES):
+            return
+
+        state = AsyncFileWriter.read_json('state.json', {})
+        for channel_key in ('standings_channel_id', 'challenges_channel_id'):
+            channel = self.bot.get_channel(state[channel_key]) if state.get(channel_key) else None
+            if channel is not None and channel.guild.id != guild_id:
+                return
+
+        os.makedirs(directory)
+        for file_name in self.LEGACY_FILES:
+            for path in (file_name, f"{file_name}.bak"):
+                if os.path.exists(path):
+                    os.replace(path, os.path.join(directory, path))
+        print(f"Moved the existing ladder files into {directory}.")
+
+    def _ladder_folders(self):
+        """
+        Yields the (guild ID, ladder name) of every
+        ladder that has a folder.
+        """
+        if not os.path.isdir(self.root):
+            return
+        for guild_folder in os.listdir(self.root):
+            guild_directory = os.path.join(self.root, guild_folder)
+            if not guild_folder.isdigit() or not os.path.isdir(guild_directory):
+                continue
+            for ladder_name in os.listdir(guild_directory):
+                if os.path.isdir(os.path.join(guild_directory, ladder_name)):
+                    yield int(guild_folder), ladder_name
+
+    async def start_expiry(self):
+        """
+        Reads the deadline index and sets the timer for the
+        earliest deadline of a ladder that is not in memory.
+
+        Ladders saved before the index existed are loaded once
+        to build it, and dropped again once idle.
+        """
+        if CHALLENGE_DEADLINE is None:
+            return
+        if self.deadlines is None:
+            self.deadlines = AsyncFileWriter.read_json(self.DEADLINES_FILE)
+            if self.deadlines is None:
+                self.deadlines = {}
+                for guild_id, ladder_name in list(self._ladder_folders()):
+                    await self.get(guild_id, ladder_name)
+                self._save_deadlines()
+        self._schedule_expiry()
+
+    def _note_deadline(self, key, deadline):
+        """
+        Stores the earliest deadline of a ladder in the
+        index, or removes the ladder if it has none.
+        """
+        if self.deadlines is None:
+            self.deadlines = AsyncFileWriter.read_json(self.DEADLINES_FILE, {})
+
+        index_key = f"{key[0]}/{key[1]}"
+        if self.deadlines.get(index_key) == deadline:
+            return
+        if deadline is None:
+            del self.deadlines[index_key]
+        else:
+            self.deadlines[index_key] = deadline
+        self._save_deadlines()
+
+    def _save_deadlines(self):
+        """
+        Schedules the deadline index to be written.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        self.writer.write(self.DEADLINES_FILE, json.dumps(self.deadlines, indent=4))
+
+    def _schedule_expiry(self):
+        """
+        Sets the timer for the earliest deadline of a ladder
+        that is not in memory. Ladders in memory keep their
+        own timer.
+        """
+        if self.expiry_timer is not None:
+            self.expiry_timer.cancel()
+            self.expiry_timer = None
+
+        deadlines = [deadline for index_key, deadline in (self.deadlines or {}).items() if self._key_of(index_key) not in self.ladders]
+        if not deadlines:
+            return
+        loop = asyncio.get_running_loop()
+        delay = max(0, min(deadlines) - time.time())
+        self.expiry_timer = loop.call_later(delay, self._start_expiry_task)
+
+    def _start_expiry_task(self):
+        """
+        Starts loading the ladders that are due. Run by the
+        expiry timer, the task is kept so it is not dropped
+        while it runs.
+        """
+        self.expiry_task = asyncio.get_running_loop().create_task(self.load_due())
+
+    async def load_due(self):
+        """
+        Loads every ladder that is not in memory and has a
+        deadline that passed, which sets its own expiry timer
+        to expire its challenges. Run by the expiry timer.
+        """
+        self.expiry_timer = None
+        now = time.time()
+        for index_key, deadline in list(self.deadlines.items()):
+            key = self._key_of(index_key)
+            if deadline <= now and key not in self.ladders:
+                try:
+                    await self.get(*key)
+                except Exception as e:
+                    # Left out until the ladder loads again and reports its deadline, so it is not retried in a loop
+                    print(f"Could not load ladder {index_key} to expire its challenges: {e}")
+                    del self.deadlines[index_key]
+        self._schedule_expiry()
+
+    @staticmethod
+    def _key_of(index_key):
+        """
+        Turns a deadline index key back into (guild ID, ladder name).
+        """
+        guild_id, ladder_name = index_key.split('/', 1)
+        return int(guild_id), ladder_name
+
+    async def evict_idle(self):
+        """
+        Saves and drops every ladder that has not
+        been used for idle_timeout seconds.
+        """
+        now = time.monotonic()
+        evicted = False
+        for key, ladder in list(self.ladders.items()):
+            if now - ladder.last_used < self.idle_timeout or ladder.is_busy():
+                continue
+            del self.ladders[key]
+            evicted = True
+            self.closing[key] = closing = asyncio.ensure_future(ladder.close())
+            try:
+                await closing
+            finally:
+                del self.closing[key]
+
+        # The deadlines of dropped ladders are now watched by the registry's timer
+        if evicted:
+            self._schedule_expiry()
+
+    async def close(self):
+        """
+        Saves every ladder still in memory.
+        """
+        if self.expiry_timer is not None:
+            self.expiry_timer.cancel()
+            self.expiry_timer = None
+        if self.expiry_task is not None and not self.expiry_task.done():
+            self.expiry_task.cancel()
+            try:
+                await self.expiry_task
+            except asyncio.CancelledError:
+                pass
+        ladders = list(self.ladders.values())
+        self.ladders.clear()
+        for ladder in ladders:
+            await ladder.close()
+        await self.writer.close()
 
 class Ladderbot(commands.Cog):
     """
@@ -32,131 +3173,137 @@ class Ladderbot(commands.Cog):
         """
         Initializes a new instance of the Ladderbot class.
 
-        Initializes the bot, teams, matches, channels, and file paths.
-        Loads data from teams.json, matches.json, and state.json files.
+        Initializes the bot and the registry holding every
+        ladder. Ladders are loaded from their own folders
+        the first time a guild uses them.
         """
         self.bot = bot
 
-        # Variables to hold the data from teams.json and matches.json
-        self.teams = {}
-        self.matches = {}
+        # Cache of member display names used when building the standings of every ladder
+        self.name_cache = MemberNameCache(bot)
 
-        # Variables for the designated channels for seperate Standings and Challenges data
-        self.standings_channel_id = None
-        self.challenges_channel_id = None
+        # Sends direct messages to members in the background
+        self.notifier = NotificationDispatcher(bot)
 
-        # Variable for updating seperate Standings and Challenges channel message
-        self.standings_message = None
-        self.challenges_message = None
+        # Refreshes the Standings and Challenges boards of every ladder
+        self.scheduler = BoardScheduler()
 
-        # Flag for whether or not the ladder is currently running, pulled from state.json
-        self.ladder_running = False
+        # Every ladder the bot hosts, one per guild plus any named ladders
+        self.ladders = LadderRegistry(bot, self.name_cache, self.notifier, self.scheduler)
 
-        # File paths
-        self.TEAMS_FILE = 'teams.json'
-        self.MATCHES_FILE = 'matches.json'
-        self.STATE_FILE = 'state.json'
+    async def get_ladder(self, ctx):
+        """
+        Returns the ladder a command works on, which is the
+        ladder the channel was set to with !use_ladder or
+        otherwise the default ladder of the guild.
+        """
+        ladder_name = self.ladders.ladder_name_of(ctx.guild.id, ctx.channel.id)
+        return await self.ladders.get(ctx.guild.id, ladder_name)
 
-        # Load data from .json files
-        self.load_teams()
-        self.load_matches()
-        self.load_state()
-    
-    def load_teams(self):
+    # Commands that do not use a ladder, so they also work in direct messages
+    DIRECT_MESSAGE_COMMANDS = {'show_help'}
+
+    async def cog_check(self, ctx):
         """
-        LOAD data from teams.json
+        Every ladder belongs to a guild, so commands that
+        use one can not be used in direct messages.
         """
-        if os.path.exists(self.TEAMS_FILE):
-            with open(self.TEAMS_FILE, 'r') as f:
-                self.teams = json.load(f)
-    
-    def load_matches(self):
+        if ctx.guild is None and ctx.command.name not in self.DIRECT_MESSAGE_COMMANDS:
+            raise commands.NoPrivateMessage()
+        return True
+
+    async def cog_load(self):
         """
-        LOAD data from matches.json
+        Starts dropping idle ladders from memory once the cog is added,
+        and writing the metrics to METRICS_FILE if one is set.
         """
-        if os.path.exists(self.MATCHES_FILE):
-            with open(self.MATCHES_FILE, 'r') as f:
-                self.matches = json.load(f)
-    
-    def load_state(self):
+        self.evict_idle_ladders.start()
+        if metrics.enabled and METRICS_FILE:
+            self.dump_metrics.start()
+
+    async def cog_before_invoke(self, ctx):
         """
-        LOAD data from state.json
+        Notes when a command started so its latency can be recorded.
         """
-        if os.path.exists(self.STATE_FILE):
-            with open(self.STATE_FILE, 'r') as f:
-                state = json.load(f)
-                self.standings_channel_id = state.get('standings_channel_id', None)
-                self.challenges_channel_id = state.get('challenges_channel_id', None)
-                self.ladder_running = state.get('ladder_running', False)
+        if metrics.enabled:
+            ctx.started_at = time.perf_counter()
 
-    def save_teams(self):
+    async def cog_after_invoke(self, ctx):
         """
-        SAVE data to teams.json
+        Records the latency of every command, and whether it failed.
         """
-        with open(self.TEAMS_FILE, 'w') as f:
-            json.dump(self.teams, f)
+        if metrics.enabled and hasattr(ctx, 'started_at'):
+            metrics.observe('command_seconds', time.perf_counter() - ctx.started_at, command=ctx.command.qualified_name)
+            if ctx.command_failed:
+                metrics.count('command_errors_total', command=ctx.command.qualified_name)
 
-    def save_matches(self):
+    async def cog_unload(self):
         """
-        SAVE data to matches.json
+        Makes sure every pending write reaches
+        the disk and every queued notification
+        is sent when the cog is removed.
         """
-        with open(self.MATCHES_FILE, 'w') as f:
-            json.dump(self.matches, f)
+        self.evict_idle_ladders.cancel()
+        self.dump_metrics.cancel()
+        await self.scheduler.close()
+        await self.notifier.close()
+        await self.ladders.close()
 
-    def save_state(self):
+    @tasks.loop(minutes=5)
+    async def evict_idle_ladders(self):
         """
-        SAVE to state.json
+        Internal task method that saves and drops
+        ladders nobody has used for a while, they
+        are loaded again when next used.
         """
-        state = {
-            'standings_channel_id': self.standings_channel_id,
-            'challenges_channel_id': self.challenges_channel_id,
-            'ladder_running': self.ladder_running
-        }
-        with open(self.STATE_FILE, 'w') as f:
-            json.dump(state, f)
-    
+        await self.ladders.evict_idle()
+
+    @tasks.loop(minutes=1)
+    async def dump_metrics(self):
+        """
+        Internal task method that writes the metrics to
+        METRICS_FILE in the Prometheus text format, for
+        a node exporter textfile collector or similar.
+        """
+        # The text is built on the event loop, where the metrics are updated, and written on a worker thread
+        text = metrics.prometheus_text()
+        await asyncio.get_running_loop().run_in_executor(None, AsyncFileWriter.atomic_write, METRICS_FILE, text, False)
+
     @commands.Cog.listener()
-    async def on_ready(self):
+    async def on_member_update(self, before, after):
         """
-        Event listener that triggers when the bot is ready and logged in.
-        It checks if the ladder is running and if a standings channel is set.
-        If both conditions are true, it updates the standings message in 
-        the channel and starts a periodic update task.
+        Event listener that forgets a member's cached
+        display name when their nickname changes.
         """
-        print(f"Logged in as {self.bot.user}")
-        if self.ladder_running:
-            print("The ladder is currently running.")
-            if self.standings_channel_id:
-                standings_channel = self.bot.get_channel(self.standings_channel_id)
-                if standings_channel:
-                    await self.update_standings_message(standings_channel)
-                    self.periodic_update_standings.start()
-            if self.challenges_channel_id:
-                challenges_channel = self.bot.get_channel(self.challenges_channel_id)
-                if challenges_channel:
-                    await self.update_challenges_message(challenges_channel)
-                    self.periodic_update_challenges.start()
+        if before.display_name != after.display_name:
+            self.name_cache.invalidate(after.id)
+            for ladder in self.ladders.loaded(after.guild.id):
+                if after.id in ladder.member_index:
+                    ladder.mark_standings_dirty()
 
-    def normalize_ranks(self):
+    @commands.Cog.listener()
+    async def on_user_update(self, before, after):
         """
-        Helper method used to normalize ranks when
-        removing teams, setting ranks, etc.
+        Event listener that forgets a user's cached
+        display name when their name changes.
         """
-        sorted_teams = sorted(self.teams.items(), key=lambda x: x[1]['rank'])
-        new_rank = 1
-        for team_name, team_data in sorted_teams:
-            if team_data['rank'] is not None:
-                team_data['rank'] = new_rank
-                new_rank += 1
-    
-    def _is_member_already_registered(self, member_id: int) -> bool:
+        self.name_cache.invalidate(after.id)
+        for ladder in self.ladders.loaded():
+            if after.id in ladder.member_index:
+                ladder.mark_standings_dirty()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
         """
-        Checks if a player is already a member of any registered team.
+        Event listener that triggers when the bot is ready and logged in.
+
+        Ladders are loaded the first time they are used, which
+        also adds their boards back to the board scheduler.
+        A ladder that is not used is loaded once one of its
+        challenges is due to expire, from the deadline index.
         """
-        for team in self.teams.values():
-            if member_id in team['members']:
-                return True
-        return False
+        print(f"Logged in as {self.bot.user}")
+        await self.ladders.start_expiry()
 
     @commands.command()
     async def register_team(self, ctx, team_name, *members: discord.Member):
@@ -168,99 +3315,169 @@ class Ladderbot(commands.Cog):
         only the user who called on it as the sole
         person on the team.
         """
-        # Check if given team_name exists among teams
-        if team_name in self.teams:
-            await ctx.send(f"Team {team_name} already exists, please choose a different team name.")
-            return
-        
+        ladder = await self.get_ladder(ctx)
+
         # Check for duplicate members
         if len(members) != len(set(members)):
             await ctx.send("You are trying to register the same member twice. Please make sure each member is unique.")
             return
-        
+    
         # Include the author in the members list if no members are given.
         if not members:
             members = (ctx.author,)
-        
+    
         # Ensure that the author is in the list of members
         if ctx.author not in members:
             await ctx.send("Only an Admin can register someone else solely to a new team. You must at least include yourself like this: !register_team teamName @You @YourTeammate")
             return
 
-        # Check if any member given is already registered on another team
-        for member in members:
-            if self._is_member_already_registered(member.id):
-                await ctx.send(f"{member.display_name} is already apart of another team.")
-                return
-        
-        # Grabs the ID of every member used as a parameter, if none given then the author is used instead
-        team_members = [member.id for member in (members or [ctx.author])]
+        # Holds the reason the team cannot be registered, sent once the locks are released
+        error = None
 
-        # Each newly created team will start in the last most place in standings
-        add_team_rank = len(self.teams) + 1
+        # Hold the whole ladder since the new team takes the last rank, and so !end_ladder cannot clear it halfway
+        async with ladder.locks.hold(team_name, ladder=True):
+            # Check if any member given is already registered on another team
+            registered_member = next((member for member in members if ladder._is_member_already_registered(member.id)), None)
 
-        self.teams[team_name] = {
-            'members': team_members,
-            'rank': add_team_rank,
-            'wins': 0,
-            'losses': 0
-        }
+            # Check if given team_name exists among teams
+            if team_name in ladder.teams:
+                error = f"Team {team_name} already exists, please choose a different team name."
+            elif registered_member is not None:
+                error = f"{registered_member.display_name} is already apart of another team."
+            else:
+                # Grabs the ID of every member used as a parameter, if none given then the author is used instead
+                team_members = [member.id for member in members]
+
+                ladder.teams[team_name] = Team(team_members)
+                ladder._index_team_members(team_name)
 
-        # Save the teams.json file
-        self.save_teams()
+                # Each newly created team will start in the last most place in standings
+                ladder._append_to_ladder(team_name)
+
+                # Log the new team to events.log
+                ladder._log_event('team_registered', teams=[team_name])
+
+        if error:
+            await ctx.send(error)
+            return
 
         # Print confirmation message with selected team name and designated members
         member_names = [ctx.guild.get_member(member_id).display_name for member_id in team_members]
         await ctx.send(f"Team {team_name} has been registered with members: {', '.join(member_names)}.")
-    
+
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def admin_register_team(self, ctx, team_name, *members: discord.Member):
         """
         Admin method of creating new teams with specified members.
         """
-        # Check if given team_name exists among teams
-        if team_name in self.teams:
-            await ctx.send(f"Team {team_name} already exists, please choose a different team name.")
-            return
-        
+        ladder = await self.get_ladder(ctx)
+
         # Check if at least one member is passed
         if not members:
             await ctx.send("You must specify at least one member to create a team. Try again using !admin_register_team teamName @member_name")
             return
-        
+    
         # Check for duplicate members
         if len(members) != len(set(members)):
             await ctx.send("You are trying to register the same member twice. Please make sure each member is unique.")
             return
-        
-        # Check if any member given is already registered on another team
-        for member in members:
-            if self._is_member_already_registered(member.id):
-                await ctx.send(f"{member.display_name} is already apart of another team.")
-                return
-        
-        # Grabs the ID of every member used as a parameter for this method and stores it
-        team_members = [member.id for member in members]
-
-        # Each newly created team will start in the last most place in standings
-        add_team_rank = len(self.teams) + 1
-
-        # Structure the dictionary that will hold team data
-        self.teams[team_name] = {
-            'members': team_members,
-            'rank': add_team_rank,
-            'wins': 0,
-            'losses': 0
-        }
 
-        # Save the teams.json file
-        self.save_teams()
+        # Holds the reason the team cannot be registered, sent once the locks are released
+        error = None
+
+        # Hold the whole ladder since the new team takes the last rank, and so !end_ladder cannot clear it halfway
+        async with ladder.locks.hold(team_name, ladder=True):
+            # Check if any member given is already registered on another team
+            registered_member = next((member for member in members if ladder._is_member_already_registered(member.id)), None)
+
+            # Check if given team_name exists among teams
+            if team_name in ladder.teams:
+                error = f"Team {team_name} already exists, please choose a different team name."
+            elif registered_member is not None:
+                error = f"{registered_member.display_name} is already apart of another team."
+            else:
+                # Grabs the ID of every member used as a parameter for this method and stores it
+                team_members = [member.id for member in members]
+
+                # Create the record that will hold team data
+                ladder.teams[team_name] = Team(team_members)
+                ladder._index_team_members(team_name)
+
+                # Each newly created team will start in the last most place in standings
+                ladder._append_to_ladder(team_name)
+
+                # Log the new team to events.log
+                ladder._log_event('team_registered', teams=[team_name])
+
+        if error:
+            await ctx.send(error)
+            return
 
         # Print confirmation message with selected team name and designated members
         member_names = [ctx.guild.get_member(member_id).display_name for member_id in team_members]
         await ctx.send(f"An Admin has registered Team {team_name} with members: {', '.join(member_names)}.")
 
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def admin_import_teams(self, ctx):
+        """
+        Admin method of registering many teams at once
+        from a .csv or .json file attached to the command.
+
+        Nothing is registered unless every team in the
+        file is valid.
+        """
+        ladder = await self.get_ladder(ctx)
+
+        if not ctx.message.attachments:
+            await ctx.send("Please attach a .csv or .json file of teams to the command, like the one made by !admin_export_teams.")
+            return
+        attachment = ctx.message.attachments[0]
+
+        # Read the teams from the file before holding anything
+        try:
+            new_teams = Ladder.parse_team_file(attachment.filename, await attachment.read())
+        except (ValueError, UnicodeDecodeError) as e:
+            await ctx.send(f"Could not read {attachment.filename}: {e}")
+            return
+        if not new_teams:
+            await ctx.send(f"No teams were found in {attachment.filename}.")
+            return
+
+        # Hold the ladder so the batch is checked and registered without anything changing in between
+        async with ladder.locks.hold(ladder=True):
+            problems = ladder.validate_team_import(new_teams)
+            if not problems:
+                ladder.import_teams(new_teams)
+
+        if problems:
+            lines = [f"No teams were imported, {len(problems)} problem(s) were found in {attachment.filename}:", *problems[:10]]
+            if len(problems) > 10:
+                lines.append(f"...and {len(problems) - 10} more.")
+            for page in PagedBoard.paginate(lines):
+                await ctx.send(page)
+            return
+
+        await ctx.send(f"An Admin has imported {len(new_teams)} team(s) from {attachment.filename}.")
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def admin_export_teams(self, ctx, file_format='csv'):
+        """
+        Admin method of downloading every team on the
+        ladder as a .csv or .json file attachment.
+        """
+        ladder = await self.get_ladder(ctx)
+
+        file_format = file_format.lower()
+        if file_format not in ('csv', 'json'):
+            await ctx.send("Please choose csv or json as the file format, like this: !admin_export_teams json")
+            return
+
+        data = ladder.export_teams(file_format)
+        await ctx.send(f"Exported {len(ladder.teams)} team(s).", file=discord.File(io.BytesIO(data), filename=f"teams.{file_format}"))
+
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def remove_team(self, ctx, team_name):
@@ -268,56 +3485,48 @@ class Ladderbot(commands.Cog):
         An Admin only method for removing a
         specified team name.
         """
-        if team_name not in self.teams:
+        ladder = await self.get_ladder(ctx)
+
+        # Removing a team shifts the rank of every team below it
+        async with ladder.locks.hold(team_name, ladder=True):
+            exists = team_name in ladder.teams
+            if exists:
+                # Any challenge involving the team goes with it, every command
+                # touching that challenge also holds this team's lock
+                removed_matches = []
+                match_id, match = ladder.get_match_of_team(team_name)
+                if match_id is not None:
+                    ladder._remove_match(match_id)
+                    removed_matches.append(match_id)
+
+                ladder._unindex_team_members(team_name)
+                shifted_teams = ladder._remove_from_ladder(team_name)
+                del ladder.teams[team_name]
+                ladder._log_event('team_removed', teams=shifted_teams, removed_teams=[team_name], removed_matches=removed_matches)
+
+        if not exists:
             await ctx.send(f"Team {team_name} does not exist.")
             return
-        
-        if team_name in self.teams:
-            del self.teams[team_name]
-            self.normalize_ranks()
-            self.save_teams()
-            await ctx.send(f"An Admin has removed Team {team_name} from the ladder.")
-    
+        await ctx.send(f"An Admin has removed Team {team_name} from the ladder.")
+
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def start_ladder(self, ctx):
         """
         Admin only method to start the ladder.
         """
-        if self.ladder_running:
+        ladder = await self.get_ladder(ctx)
+
+        if ladder.ladder_running:
             await ctx.send("The ladder is already running.")
             return
         
-        self.ladder_running = True
-        self.normalize_ranks()
-        self.save_teams()
-        self.save_state()
+        ladder.ladder_running = True
+        ladder.normalize_ranks()
+        ladder.compact_event_log()
+        ladder.save_state()
         await self.post_standings(ctx)
         await ctx.send("The ladder has been started!")
-    
-    async def send_challenge_notification(self, challenger_team, team_name):
-        """
-        This internal method will be used in the challenge and 
-        admin_challenge methods to send a message to the members
-        of a challenged team notifying them they have been challenged.
-
-        It uses the challenger_team parameter to hold the challenger team name
-        to send in the message, and uses team_name to find all members on that team
-        and then send them the message
-        """
-        if team_name in self.teams:
-            member_ids = self.teams[team_name]['members']
-            for member_id in member_ids:
-                # Fetch the member by their ID number
-                member = self.bot.get_user(member_id)
-                if member is not None:
-                    try:
-                        # If member is found, send message displaying who challenged them
-                        await member.send(f"Your team '{team_name}' has been challenged by Team '{challenger_team}'!")
-                    except discord.Forbidden:
-                        print(f"Could not send a message to {member} (ID: {member_id}).")
-                else:
-                    print(f"Member with ID {member_id} not found.")
 
     @commands.command()
     async def challenge(self, ctx, challenger_team, team_name):
@@ -330,53 +3539,84 @@ class Ladderbot(commands.Cog):
         Only members of the challenging team can send
         out challenges on their teams behalf.
         """
+        ladder = await self.get_ladder(ctx)
+
         # Checks if the ladder is running
-        if not self.ladder_running:
+        if not ladder.ladder_running:
             await ctx.send("The ladder has not been started yet.")
             return
         
         # Ensure the challenger is part of the challenging team
-        if ctx.author.id not in self.teams[challenger_team]['members']:
+        if ladder.get_team_of_member(ctx.author.id) != challenger_team:
             await ctx.send("You are not part of the challenging team.")
             return
         
-        # Checks if both teams exist in teams.json
-        if challenger_team not in self.teams or team_name not in self.teams:
-            await ctx.send("One or both teams do not exist.")
-            return
-        
-        # Holds the rank of each team
-        challenger_rank = self.teams[challenger_team]['rank']
-        challenged_rank = self.teams[team_name]['rank']
-        
-        # Calculates to see if challenge is within the rank range of 2 above at most
-        if challenged_rank > challenger_rank or challenged_rank <= challenger_rank - 3:
-            await ctx.send(f"You can only challenge teams up to two ranks above your current rank.")
-            return
+        # Holds the reason the challenge cannot be made, sent once the locks are released
+        error = None
+
+        # Lock both teams and the ladder so their ranks and matches cannot change while checking
+        async with ladder.locks.hold(challenger_team, team_name, ladder=True):
+            # Checks if both teams exist in teams.json
+            if challenger_team not in ladder.teams or team_name not in ladder.teams:
+                error = "One or both teams do not exist."
+
+            # A team in a match with itself could never be reported
+            elif challenger_team == team_name:
+                error = "A team cannot challenge itself."
+
+            # Calculates to see if challenge is within the rank range of 2 above at most
+            elif not ladder.teams[challenger_team].rank - 3 < ladder.teams[team_name].rank <= ladder.teams[challenger_team].rank:
+                error = f"You can only challenge teams up to two ranks above your current rank. {ladder.challenge_suggestion(challenger_team)}"
         
-        # Check if either team is currently involved in another challenge, if so then cancel
-        for match in self.matches.values():
-            if (match['challenged'] == team_name or match['challenger'] == team_name or
-            match['challenged'] == challenger_team or match['challenger'] == challenger_team):
-                await ctx.send(f"One or both of these teams are currently involved in a match.")
-                return
+            # Check if either team is currently involved in another challenge, if so then cancel
+            elif ladder._is_team_in_match(team_name) or ladder._is_team_in_match(challenger_team):
+                error = f"One or both of these teams are currently involved in a match. {ladder.challenge_suggestion(challenger_team)}"
+
+            else:
+                # If all checks are passed, create and add the new challenge to matches.json
+                match_id = f"{challenger_team}"
+                ladder._add_match(match_id, challenger_team, team_name)
             
-        # If all checks are passed, create and add the new challenge to matches.json
-        match_id = f"{challenger_team}"
-        self.matches[match_id] = {
-            'challenger': challenger_team,
-            'challenged': team_name,
-            'status': 'pending'
-        }
-        
-        # Save matches.json file
-        self.save_matches()
+                # Log the new challenge to events.log
+                ladder._log_event('challenge_issued', matches=[match_id])
+
+        if error:
+            await ctx.send(error)
+            return
 
         # Prints a message to the channel the challenge was called from confirming the challenge
         await ctx.send(f"{challenger_team} has challenged {team_name}!")
 
         # Sends a message to every member in the team that was challenged
-        await self.send_challenge_notification(challenger_team, team_name)
+        await ladder.send_challenge_notification(challenger_team, team_name)
+
+    @commands.command()
+    async def challengeable(self, ctx, team_name=None):
+        """
+        Callable method by everyone to see which teams a
+        team can challenge right now. Without a team name,
+        every team that can challenge someone is listed.
+        """
+        ladder = await self.get_ladder(ctx)
+
+        if team_name is None:
+            available = ladder.build_available_challenges()
+            if not available:
+                await ctx.send("No team can challenge another team right now.")
+                return
+            for page in PagedBoard.paginate(["**Available Challenges:**", *available]):
+                await ctx.send(page)
+            return
+
+        if team_name not in ladder.teams:
+            await ctx.send(f"Team {team_name} does not exist.")
+            return
+
+        if ladder._is_team_in_match(team_name):
+            await ctx.send(f"Team {team_name} is already in a match and cannot challenge another team until it is resolved.")
+            return
+
+        await ctx.send(ladder.challenge_suggestion(team_name))
 
     @commands.command()
     async def cancel_challenge(self, ctx, team_name):
@@ -384,27 +3624,38 @@ class Ladderbot(commands.Cog):
         A team that has sent out a challenge in mistake
         can use this method to cancel it.
         """
+        ladder = await self.get_ladder(ctx)
+
         # Check if given team name actually exists in teams.json
-        if team_name not in self.teams:
+        if team_name not in ladder.teams:
             await ctx.send(f"Team {team_name} does not exist.")
             return
 
         # Check if the given team name has an active challenge sent out
-        match_id = next((key for key, value in self.matches.items() if value['challenger'] == team_name), None)
+        match_id, match = ladder.get_match_of_team(team_name)
 
         # If no sent challenge is found from team_name, stop method and print message
-        if not match_id:
+        if match is None or match.challenger != team_name:
             await ctx.send(f"Team {team_name} does not have an active challenge.")
             return
         
         # Ensure the author who called command is part of team that is trying to cancel the challenge
-        if ctx.author.id not in self.teams[team_name]['members']:
+        if ladder.get_team_of_member(ctx.author.id) != team_name:
             await ctx.send(f"You are not part of Team {team_name} and may not cancel their challenge!")
             return
         
-        # Cancel the challenge and print confirmation message
-        del self.matches[match_id]
-        self.save_matches()
+        # Lock both teams, the challenge may have been reported or canceled while waiting
+        async with ladder.locks.hold(match.challenger, match.challenged):
+            still_open = ladder.matches.get(match_id) is match
+            if still_open:
+                # Cancel the challenge
+                ladder._cancel_match(match_id)
+
+        if not still_open:
+            await ctx.send(f"Team {team_name} does not have an active challenge.")
+            return
+
+        # Print confirmation message
         await ctx.send(f"The challenge issued by {team_name} has been successfully canceled.")
 
     @commands.command()
@@ -414,49 +3665,52 @@ class Ladderbot(commands.Cog):
         Admin only method so that an admin can
         manually set up challenges if need be.
         """
+        ladder = await self.get_ladder(ctx)
+
         # Checks if the ladder is running
-        if not self.ladder_running:
+        if not ladder.ladder_running:
             await ctx.send("The ladder has not been started yet.")
             return
         
-        # Checks if both teams exist in teams.json
-        if challenger_team not in self.teams or team_name not in self.teams:
-            await ctx.send("One or both teams do not exist.")
-            return
-        
-        # Holds the rank of each team
-        challenger_rank = self.teams[challenger_team]['rank']
-        challenged_rank = self.teams[team_name]['rank']
-        
-        # Calculates to see if challenge is within the rank range of 2 above at most
-        if challenged_rank > challenger_rank or challenged_rank <= challenger_rank - 3:
-            await ctx.send(f"Teams can only challenge other teams up to two ranks above their current rank.")
-            return
+        # Holds the reason the challenge cannot be made, sent once the locks are released
+        error = None
+
+        # Lock both teams and the ladder so their ranks and matches cannot change while checking
+        async with ladder.locks.hold(challenger_team, team_name, ladder=True):
+            # Checks if both teams exist in teams.json
+            if challenger_team not in ladder.teams or team_name not in ladder.teams:
+                error = "One or both teams do not exist."
+
+            # A team in a match with itself could never be reported
+            elif challenger_team == team_name:
+                error = "A team cannot challenge itself."
+
+            # Calculates to see if challenge is within the rank range of 2 above at most
+            elif not ladder.teams[challenger_team].rank - 3 < ladder.teams[team_name].rank <= ladder.teams[challenger_team].rank:
+                error = f"Teams can only challenge other teams up to two ranks above their current rank. {ladder.challenge_suggestion(challenger_team)}"
         
-        # Check if either team is currently involved in another challenge, if so then cancel
-        for match in self.matches.values():
-            if (match['challenged'] == team_name or match['challenger'] == team_name or
-            match['challenged'] == challenger_team or match['challenger'] == challenger_team):
-                await ctx.send(f"One or both of these teams are currently involved in a match. Admin challenge canceled.")
-                return
+            # Check if either team is currently involved in another challenge, if so then cancel
+            elif ladder._is_team_in_match(team_name) or ladder._is_team_in_match(challenger_team):
+                error = f"One or both of these teams are currently involved in a match. Admin challenge canceled. {ladder.challenge_suggestion(challenger_team)}"
+
+            else:
+                # If all checks are passed, create and add the new challenge to matches.json
+                match_id = f"{challenger_team}"
+                ladder._add_match(match_id, challenger_team, team_name)
             
-        # If all checks are passed, create and add the new challenge to matches.json
-        match_id = f"{challenger_team}"
-        self.matches[match_id] = {
-            'challenger': challenger_team,
-            'challenged': team_name,
-            'status': 'pending'
-        }
-        
-        # Save matches.json file
-        self.save_matches()
+                # Log the new challenge to events.log
+                ladder._log_event('challenge_issued', matches=[match_id])
+
+        if error:
+            await ctx.send(error)
+            return
         
         # Prints message from channel method was called from confirming challenge was made by an Admin
         await ctx.send(f"An Admin has manually created this challenge: {challenger_team} has challenged {team_name}!")
 
         # Sends a message to every member in the team that was challenged
-        await self.send_challenge_notification(challenger_team, team_name)
-    
+        await ladder.send_challenge_notification(challenger_team, team_name)
+
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def admin_cancel_challenge(self, ctx, team_name):
@@ -464,24 +3718,35 @@ class Ladderbot(commands.Cog):
         Admin only method for handling canceling challenges
         sent out by a given team.
         """
+        ladder = await self.get_ladder(ctx)
+
         # Check if given team name actually exists in teams.json
-        if team_name not in self.teams:
+        if team_name not in ladder.teams:
             await ctx.send(f"Team {team_name} does not exist.")
             return
 
         # Check if the given team name has an active challenge sent out
-        match_id = next((key for key, value in self.matches.items() if value['challenger'] == team_name), None)
+        match_id, match = ladder.get_match_of_team(team_name)
 
         # If no sent challenge is found from team_name, stop method and print message
-        if not match_id:
+        if match is None or match.challenger != team_name:
             await ctx.send(f"Team {team_name} does not have an active challenge.")
             return
         
-        # Cancel the challenge and print confirmation message
-        del self.matches[match_id]
-        self.save_matches()
+        # Lock both teams, the challenge may have been reported or canceled while waiting
+        async with ladder.locks.hold(match.challenger, match.challenged):
+            still_open = ladder.matches.get(match_id) is match
+            if still_open:
+                # Cancel the challenge
+                ladder._cancel_match(match_id)
+
+        if not still_open:
+            await ctx.send(f"Team {team_name} does not have an active challenge.")
+            return
+
+        # Print confirmation message
         await ctx.send(f"The challenge issued by {team_name} has been successfully canceled by an Admin.")
-    
+
     @commands.command()
     async def report_win(self, ctx, winning_team):
         """
@@ -497,40 +3762,33 @@ class Ladderbot(commands.Cog):
         no rank changes will occur as they defended
         their rank.
         """
+        ladder = await self.get_ladder(ctx)
+
         # Check if the winning team is in matches.json
-        match = next((m for m in self.matches.values() if m['challenger'] == winning_team or m['challenged'] == winning_team), None)
+        match_id, match = ladder.get_match_of_team(winning_team)
         if match is None:
             await ctx.send(f"There is no match involving {winning_team}.")
             return
 
         # Ensure the author is part of the match
-        if ctx.author.id not in self.teams[match['challenger']]['members'] and ctx.author.id not in self.teams[match['challenged']]['members']:
+        if ladder.get_team_of_member(ctx.author.id) not in (match.challenger, match.challenged):
             await ctx.send("You are not part of this match.")
             return
         
-        # Determine the loser team
-        loser_team = match['challenged'] if match['challenger'] == winning_team else match['challenger']
-        winner_team = winning_team
+        # Lock both teams, and the whole ladder if the challenger won since ranks will shift
+        async with ladder.locks.hold(match.challenger, match.challenged, ladder=(winning_team == match.challenger)):
+            # The match may have been reported or canceled while waiting for the locks
+            still_open = ladder.matches.get(match_id) is match
+            if still_open:
+                # Apply the result to both teams and the ladder
+                loser_team, ranks_changed = ladder._report_result(match_id, winning_team)
 
-        # If the winning team was a challenger then rank changes need to occur
-        if winner_team == match['challenger']:
-            # Challenger wins - update ranks
-            losing_rank = self.teams[loser_team]['rank']
-
-            # Winner team takes the loser's rank on the ladder
-            self.teams[winner_team]['rank'] = losing_rank
-
-            # The loser team moves down on rank
-            self.teams[loser_team]['rank'] += 1
-
-            # Shift teams ranked below the losing team down by one
-            for team_name, team_data in self.teams.items():
-                if team_name != winner_team and team_name != loser_team and team_data['rank'] >= self.teams[loser_team]['rank']:
-                    team_data['rank'] += 1
-            
-            # Normalize ranks for safe measure
-            self.normalize_ranks()
+        if not still_open:
+            await ctx.send(f"There is no match involving {winning_team}.")
+            return
 
+        # If the winning team was a challenger then rank changes occurred
+        if ranks_changed:
             # Send message confirmation about win and rank changes
             await ctx.send(f"Team {winning_team} has won the match and taken the rank of Team {loser_team}! Team {loser_team} moves down one in the ranks...")
         
@@ -539,15 +3797,6 @@ class Ladderbot(commands.Cog):
             # Challenger loses - no rank change occurs.
             await ctx.send(f"Team {loser_team} has lost their match against Team {winning_team}... No rank changes occur.")
 
-        # Update wins and losses for both teams
-        self.teams[winning_team]['wins'] += 1
-        self.teams[loser_team]['losses'] += 1
-
-        # Remove the match from matches.json, then save it and teams.json
-        del self.matches[match['challenger']]
-        self.save_teams()
-        self.save_matches()
-
         #Post the newly updated standings
         await self.post_standings(ctx)
 
@@ -563,35 +3812,28 @@ class Ladderbot(commands.Cog):
         by an Admin and does not require the author
         to be part of the match.
         """
+        ladder = await self.get_ladder(ctx)
+
         # Check if the winning team is in matches.json
-        match = next((m for m in self.matches.values() if m['challenger'] == winning_team or m['challenged'] == winning_team), None)
+        match_id, match = ladder.get_match_of_team(winning_team)
         if match is None:
             await ctx.send(f"There is no match involving {winning_team}.")
             return
         
-        # Determine the loser team
-        loser_team = match['challenged'] if match['challenger'] == winning_team else match['challenger']
-        winner_team = winning_team
-
-        # If the winning team was a challenger then rank changes need to occur
-        if winner_team == match['challenger']:
-            # Challenger wins - update ranks
-            losing_rank = self.teams[loser_team]['rank']
+        # Lock both teams, and the whole ladder if the challenger won since ranks will shift
+        async with ladder.locks.hold(match.challenger, match.challenged, ladder=(winning_team == match.challenger)):
+            # The match may have been reported or canceled while waiting for the locks
+            still_open = ladder.matches.get(match_id) is match
+            if still_open:
+                # Apply the result to both teams and the ladder
+                loser_team, ranks_changed = ladder._report_result(match_id, winning_team)
 
-            # Winner team takes the loser's rank on the ladder
-            self.teams[winner_team]['rank'] = losing_rank
-
-            # The loser team moves down on rank
-            self.teams[loser_team]['rank'] += 1
-
-            # Shift teams ranked below the losing team down by one
-            for team_name, team_data in self.teams.items():
-                if team_name != winner_team and team_name != loser_team and team_data['rank'] >= self.teams[loser_team]['rank']:
-                    team_data['rank'] += 1
-            
-            # Normalize ranks for safe measure
-            self.normalize_ranks()
+        if not still_open:
+            await ctx.send(f"There is no match involving {winning_team}.")
+            return
 
+        # If the winning team was a challenger then rank changes occurred
+        if ranks_changed:
             # Send message confirmation about win and rank changes
             await ctx.send(f"Team {winning_team} has won the match and taken the rank of Team {loser_team}! Team {loser_team} moves down one in the ranks... -This report was made by an Admin.")
         
@@ -600,41 +3842,76 @@ class Ladderbot(commands.Cog):
             # Challenger loses - no rank change occurs.
             await ctx.send(f"Team {loser_team} has lost their match against Team {winning_team}... No rank changes occur. -This report was made by an Admin.")
 
-        # Update wins and losses for both teams
-        self.teams[winning_team]['wins'] += 1
-        self.teams[loser_team]['losses'] += 1
-
-        # Remove the match from matches.json, then save it and teams.json
-        del self.matches[match['challenger']]
-        self.save_teams()
-        self.save_matches()
-
         # Post the newly updated standings
         await self.post_standings(ctx)
-    
+
+    @commands.command()
+    async def history(self, ctx, team_name, count: int = 10):
+        """
+        Callable method by everyone to see the latest
+        results of a team, newest first.
+        """
+        ladder = await self.get_ladder(ctx)
+
+        # Keep the number of results between 1 and 50
+        count = max(1, min(count, 50))
+
+        results = await ladder.history.team_results(team_name, count)
+        if not results:
+            await ctx.send(f"No results have been recorded for Team {team_name}.")
+            return
+
+        lines = [f"**Latest results of Team {team_name}:**", *(ladder._format_result(result) for result in results)]
+        for page in PagedBoard.paginate(lines):
+            await ctx.send(page)
+
+    @commands.command()
+    async def head_to_head(self, ctx, team_a, team_b, count: int = 10):
+        """
+        Callable method by everyone to see how two teams
+        have done against each other, with their latest
+        results newest first.
+        """
+        ladder = await self.get_ladder(ctx)
+
+        if team_a == team_b:
+            await ctx.send("Please choose two different teams.")
+            return
+
+        # Keep the number of results between 1 and 50
+        count = max(1, min(count, 50))
+
+        wins, results = await ladder.history.head_to_head(team_a, team_b, count)
+        if not results:
+            await ctx.send(f"No results have been recorded between Team {team_a} and Team {team_b}.")
+            return
+
+        lines = [
+            f"**Team {team_a} vs Team {team_b}:** {wins[team_a]} - {wins[team_b]}",
+            *(ladder._format_result(result) for result in results)
+        ]
+        for page in PagedBoard.paginate(lines):
+            await ctx.send(page)
+
     @commands.command()
     async def post_challenges(self, ctx):
         """
         This method posts the current challenges
         in the matches.json file.
         """
+        ladder = await self.get_ladder(ctx)
+
         # Check if matches.json has any data inside of it
-        if not self.matches:
+        if not ladder.matches:
             await ctx.send("There are currently no active challenges on the board.")
             return
         
         # Format the list of current challenges
-        challenge_list = []
-        for match_id, match_info in self.matches.items():
-            challenger = match_info['challenger']
-            challenged = match_info['challenged']
-            challenge_list.append(f"**Match ID**: {match_id}\n**Challenger**: {challenger}\n**Challenged**: {challenged}\n")
-        
-        # Join all challenges from challenge_list into a single string
-        challenges_text = "\n".join(challenge_list)
+        challenge_list = ladder._build_challenges_entries()
 
-        # Send the list of challenges
-        await ctx.send(f"**Current Challenges**:\n{challenges_text}")
+        # Send the list of challenges, split over several messages if it is too long for one
+        for page in PagedBoard.paginate(["**Current Challenges**:", *challenge_list]):
+            await ctx.send(page)
     
     # TODO - Added to documentation but still need to add logic
     @commands.command()
@@ -647,20 +3924,17 @@ class Ladderbot(commands.Cog):
 
         You do not need to clear the channel before setting a new one
         """
+        ladder = await self.get_ladder(ctx)
+
         # Takes the given channel's integer ID to the bot and saves state.json
-        self.challenges_channel_id = channel.id
-        self.save_state()
+        if ladder.challenges_channel_id != channel.id:
+            ladder.challenges_board.forget()
+        ladder.challenges_channel_id = channel.id
+        ladder.save_state()
         await ctx.send(f"The updating Challenges board is now set to: {channel.mention}")
 
-        # Initialize or update the challenges message in the given channel
-        await self.update_challenges_message(channel)
-
-        # Stop challenge @tasks if it's already running to ensure clean channel setup
-        if self.periodic_update_challenges.is_running():
-            self.periodic_update_challenges.stop()
-        
-        # Start challenges @tasks on specified channel
-        self.periodic_update_challenges.start()
+        # Schedule the challenges board, which initializes or updates its message in the given channel right away
+        ladder.schedule_board('challenges')
 
     # TODO: Still working on challenges channel logic overall
     @commands.command()
@@ -674,134 +3948,75 @@ class Ladderbot(commands.Cog):
 
         You do not need to clear the channel before setting a new one
         """
-        if self.challenges_channel_id is not None:
-            # If periodic challenges update is running, it is stopped
-            if self.periodic_update_challenges.is_running():
-                self.periodic_update_challenges.stop()
-            
+        ladder = await self.get_ladder(ctx)
+
+        if ladder.challenges_channel_id is not None:
+            # Stop the scheduled refreshes of the challenges board
+            ladder.unschedule_board('challenges')
+
             # Set challenges channel ID to none, save state.json, and send confirmation message
-            self.challenges_channel_id = None
-            self.save_state()
+            ladder.challenges_channel_id = None
+            ladder.challenges_board.forget()
+            ladder.save_state()
             await ctx.send("The Challenges channel ID has been cleared.")
         else:
             await ctx.send("Nothing is currently assigned as the Challenges channel. Use !set_challenges_channel #channel_name to assign one.")
             return
-    
-    async def generate_challenges(self):
-        """
-        Internal method used for the seperate
-        standings channel scoreboard.
 
-        Works just like post_challenges, but adds
-        a time stamp and returns everything back
-        into one long string.
+    @commands.command()
+    async def post_standings(self, ctx):
         """
-        # Format the list of current challenges
-        challenge_list = []
-        for match_id, match_info in self.matches.items():
-            challenger = match_info['challenger']
-            challenged = match_info['challenged']
-            challenge_list.append(f"**Match ID**: {match_id}\n**Challenger**: {challenger}\n**Challenged**: {challenged}\n")
-        
-        # Join all challenges from challenge_list into a single string
-        challenges_text = "\n".join(challenge_list)
-
-        # Create time stamp and format it to be readable
-        time_stamp = time.time()
-        readable_time_stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time_stamp))
-
-        # Join the challenges text to one long string and then append the time stamp to the end
-        challenges = f"{challenges_text}\n\nLast updated: {readable_time_stamp}"
-        
-        # Return result to use as updating message in Challenges channel
-        return challenges
-    
-    async def update_challenges_message(self, channel):
+        Callable method by everyone to post the
+        standings in the channel this is called from.
         """
-        Internal method used to find and edit the
-        dynamically changing message in the challenges.
+        ladder = await self.get_ladder(ctx)
 
-        If no message exists, a new message is 
-        created in the designated channel
-        """
-        # Get the latest message from the channel's history
-        async for message in channel.history(limit=1): 
-            # Assign the latest message to challenges_message
-            challenges_message = message
-            break
-        else:
-            # If no messages are found, set to None
-            challenges_message = None
-        
-        # Generate the challenges text
-        challenges_text = await self.generate_challenges()
+        # Format the team information of every team in rank order
+        standings_list = await ladder._build_standings_lines(ctx.guild)
 
-        # Check if a message is already present in the channel
-        if challenges_message:
-            # If message is present, edit and update the message with the new challenges report
-            await challenges_message.edit(content=challenges_text)
-        else:
-            # If no message is found in channel, send a new message with the new challenges report
-            await channel.send(content=challenges_text)
+        # Send standings to the channel where the command was called, split over several messages if it is too long for one
+        for page in PagedBoard.paginate(["**Current Standings**:", *standings_list]):
+            await ctx.send(page)
 
-    async def initialize_challenges_message(self, channel):
-        """
-        Assigns the return result of generate_challenges()
-        to our self.challenges_message that was made 
-        with our class constructor.
-        """
-        challenges = await self.generate_challenges()
-        self.challenges_message = await channel.send(f"**Current Challenges:**\n{challenges}")
-        return self.challenges_message
-    
-    @tasks.loop(seconds=15)
-    async def periodic_update_challenges(self):
+    @commands.command()
+    async def ratings(self, ctx, count: int = 10):
         """
-        Internal task method that will update
-        the seperate challenges board that appears in the
-        designated challenges channel every 15 seconds.
+        Callable method by everyone to post the teams
+        with the highest Elo ratings.
         """
-        if self.challenges_channel_id:
-            channel = self.bot.get_channel(self.challenges_channel_id)
-            if channel:
-                await self.update_challenges_message(channel)
+        ladder = await self.get_ladder(ctx)
+
+        if not ladder.teams:
+            await ctx.send("There are no teams on the ladder yet.")
+            return
+
+        # Keep the number of teams between 1 and 100
+        count = max(1, min(count, 100))
+
+        # Ratings are kept up to date on every team, so only the top teams need picking out
+        top_teams = heapq.nlargest(count, ladder.teams.items(), key=lambda team: team[1].rating)
+        lines = ["**Ratings:**"]
+        for place, (team_name, team_data) in enumerate(top_teams, start=1):
+            lines.append(f"{place}. {team_name} - {round(team_data.rating)} (Rank {team_data.rank}, W: {team_data.wins} L: {team_data.losses})")
+        for page in PagedBoard.paginate(lines):
+            await ctx.send(page)
 
     @commands.command()
-    async def post_standings(self, ctx):
+    @commands.has_permissions(administrator=True)
+    async def admin_recompute_ratings(self, ctx):
         """
-        Callable method by everyone to post the
-        standings in the channel this is called from.
+        Admin method of recomputing every team's rating
+        from the results of the current season, such as
+        after teams were imported or results were added
+        by older versions of the bot.
         """
+        ladder = await self.get_ladder(ctx)
 
-        # Sort the teams by rank
-        sorted_teams = sorted(self.teams.items(), key=lambda x: (x[1]['rank'] is None, x[1]['rank']))
-
-        # Variable to hold data before we join it into a string
-        standings_list = []
-
-        # Iterate through every team in our sorted teams
-        for team in sorted_teams:
-            if team[1]['rank'] is not None:
-                
-                # Collect names of members on each team
-                member_names = []
-                for member_id in team[1]['members']:
-                    try:
-                        user = await self.bot.fetch_user(member_id)
-                        member_names.append(user.display_name)
-                    except discord.NotFound:
-                        member_names.append("Unknown User")
-                    except discord.HTTPException:
-                        member_names.append("Fetch Error")
-                
-                # Format the team information into something kind of pretty
-                standings_list.append(f"{team[1]['rank']}. {team[0]} ({' - '.join(member_names)}) - W: {team[1]['wins']} L: {team[1]['losses']}")
-        
-        # Join everything from standings_list into one string
-        standings = "\n".join(standings_list)
+        # Hold every team and the ladder so no result is reported while the ratings are replaced
+        async with ladder.locks.hold(*ladder.teams, ladder=True):
+            replayed = await ladder.recompute_ratings()
 
-        # Send standings to the channel where the command was called
-        await ctx.send(f"**Current Standings**:\n{standings}")
+        await ctx.send(f"An Admin has recomputed the ratings of {len(ladder.teams)} team(s) from {replayed} result(s).")
 
     @commands.command()
     @commands.has_permissions(administrator=True)
@@ -813,21 +4028,18 @@ class Ladderbot(commands.Cog):
 
         You do not need to clear the channel before setting a new one
         """
+        ladder = await self.get_ladder(ctx)
+
         # Grabs the given channel's integer ID to the bot and saves to state.json
-        self.standings_channel_id = channel.id
-        self.save_state()
+        if ladder.standings_channel_id != channel.id:
+            ladder.standings_board.forget()
+        ladder.standings_channel_id = channel.id
+        ladder.save_state()
         await ctx.send(f"The updating Standings board is now set to: {channel.mention}")
 
-        # Initialize or update the standings message in the new channel
-        await self.update_standings_message(channel)
+        # Schedule the standings board, which initializes or updates its message in the new channel right away
+        ladder.schedule_board('standings')
 
-        # Stop the @tasks if it's already running to ensure clean channel setup
-        if self.periodic_update_standings.is_running():
-            self.periodic_update_standings.stop()
-        
-        # Start standings @tasks on specified channel
-        self.periodic_update_standings.start()
-    
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def clear_standings_channel(self, ctx):
@@ -839,115 +4051,22 @@ class Ladderbot(commands.Cog):
 
         You do not need to clear the channel before setting a new one
         """
-        if self.standings_channel_id is not None:
-            # If periodic standings updates are running, it is stopped
-            if self.periodic_update_standings.is_running():
-                self.periodic_update_standings.stop()
-            
+        ladder = await self.get_ladder(ctx)
+
+        if ladder.standings_channel_id is not None:
+            # Stop the scheduled refreshes of the standings board
+            ladder.unschedule_board('standings')
+
             # Set standings channel ID to none, save state.json and send confirmation message
-            self.standings_channel_id = None
-            self.save_state()
+            ladder.standings_channel_id = None
+            ladder.standings_board.forget()
+            ladder.save_state()
             await ctx.send("The Standings channel ID has been cleared.")
             return
         else:
             await ctx.send("Nothing is currently assigned as the Standings channel. Use !set_standings_channel #channel_name to assign one.")
             return
-    
-    async def generate_standings(self):
-        """
-        Internal method used for the seperate
-        standings channel scoreboard.
 
-        Works just like post_standings, but adds
-        a time stamp and  returns everything back
-        into one long string.
-
-        Is also used when ending the ladder
-        """
-        # Sort the teams by rank
-        sorted_teams = sorted(self.teams.items(), key=lambda x: (x[1]['rank'] is None, x[1]['rank']))
-        
-        # Variable to hold data before we join it into a string
-        standings_list = []
-
-        # Iterate through every team in our sorted teams
-        for team in sorted_teams:
-            if team[1]['rank'] is not None:
-                
-                # Collect names of members on each team
-                member_names = []
-                for member_id in team[1]['members']:
-                    try:
-                        user = await self.bot.fetch_user(member_id)
-                        member_names.append(user.display_name)
-                    except discord.NotFound:
-                        member_names.append("Unknown User")
-                    except discord.HTTPException:
-                        member_names.append("Fetch Error")
-                
-                # Format the team information into something kind of pretty
-                standings_list.append(f"{team[1]['rank']}. {team[0]} ({' - '.join(member_names)}) - W: {team[1]['wins']} L: {team[1]['losses']}")
-        
-        # Create time stamp and format it to be readable
-        time_stamp = time.time()
-        readable_time_stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time_stamp))
-
-        #Join the standings list into a string and append the timestamp
-        standings = "\n".join(standings_list)
-        standings += f"\n\nLast updated: {readable_time_stamp}"
-        
-        # Return result to use as updating message in Standings channel
-        return standings
-    
-    async def update_standings_message(self, channel):
-        """
-        Internal method used to edit the scoreboard
-        that appears in the designated standings channel.
-
-        If no message exists to edit, a new message is
-        created in the designated standings channel.
-        """
-        # Get the latest message from the channel's history
-        async for message in channel.history(limit=1): 
-            # Assign the latest message to standings_message
-            standings_message = message
-            break
-        else:
-            # If no messages are found, set to None
-            standings_message = None
-        
-        # Generate the standings text
-        standings_text = await self.generate_standings()
-
-        if standings_message:
-            # Update the existing message in the standings channel
-            await standings_message.edit(content=standings_text)
-        else:
-            # Send a new message if none exists in the standings channel
-            await channel.send(content=standings_text)
-    
-    async def initialize_standings_message(self, channel):
-        """
-        Assigns the return result of generate_standings()
-        to our self.standings_message that was made 
-        with our class constructor.
-        """
-        standings = await self.generate_standings()
-        self.standings_message = await channel.send(f"**Current Standings:**\n{standings}")
-        return self.standings_message
-    
-    @tasks.loop(seconds=15)
-    async def periodic_update_standings(self):
-        """
-        Internal task method that will update
-        the seperate scoreboard that appears in the
-        designated standings channel every 15 seconds.
-        """
-        if self.standings_channel_id:
-            channel = self.bot.get_channel(self.standings_channel_id)
-            if channel:
-                await self.update_standings_message(channel)
-    
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def set_rank(self, ctx, team_name, rank: int):
@@ -955,50 +4074,35 @@ class Ladderbot(commands.Cog):
         Admin only callable method for manually
         changing a team's rank to a specified integer
         """
-        if team_name not in self.teams:
-            await ctx.send(f"Team {team_name} does not exist.")
-            return
-        
-        if rank < 1 or rank > len(self.teams):
-            await ctx.send(f"Rank must be between 1 and {len(self.teams)}.")
-            return
-        
-        old_rank = self.teams[team_name]['rank']
-        if old_rank == rank:
-            await ctx.send(f"Team {team_name} is already at rank {rank}.")
+        ladder = await self.get_ladder(ctx)
+
+        # Holds the reason the rank cannot be set, sent once the locks are released
+        error = None
+
+        # Setting a rank shifts every team between the old and new rank
+        async with ladder.locks.hold(team_name, ladder=True):
+            if team_name not in ladder.teams:
+                error = f"Team {team_name} does not exist."
+            elif rank < 1 or rank > len(ladder.teams):
+                error = f"Rank must be between 1 and {len(ladder.teams)}."
+            elif ladder.teams[team_name].rank == rank:
+                error = f"Team {team_name} is already at rank {rank}."
+            else:
+                # Set the new rank for the specified team, only the teams between
+                # old_rank and rank are moved by one to make room for it
+                moved_teams = ladder._move_team_to_rank(team_name, rank)
+
+                # Log the rank change
+                ladder._log_event('rank_set', teams=moved_teams)
+
+        if error:
+            await ctx.send(error)
             return
-        
-        # Create a new dictionary to hold the temporary team data
-        temp_teams = {name: data.copy() for name, data in self.teams.items()}
-
-        if old_rank < rank:
-            # Move teams between old_rank and rank up by one
-            for team, data in temp_teams.items():
-                if data['rank'] is not None and old_rank < data['rank'] <= rank:
-                    data['rank'] -= 1
-        elif old_rank > rank:
-        # Move teams between rank and old_rank down by one
-            for team, data in temp_teams.items():
-                if data['rank'] is not None and rank <= data['rank'] < old_rank:
-                    data['rank'] += 1
-        
-        # Set the new rank for the specified team
-        temp_teams[team_name]['rank'] = rank
-
-        # Fix any potential rank inconsistencies
-        all_teams = sorted(temp_teams.items(), key=lambda x: x[1]['rank'])
-        for new_rank, (name, data) in enumerate(all_teams, start=1):
-            if data['rank'] is not None:
-                temp_teams[name]['rank'] = new_rank
-        
-        # Update the self.teams dictionary
-        self.teams.update(temp_teams)
 
-        # Save the teams.json, post standings, and send confirmation message
-        self.save_teams()
+        # Post standings and send confirmation message
         await self.post_standings(ctx)
         await ctx.send(f"Rank of {team_name} has been set to {rank}.")
-    
+
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def add_win(self, ctx, team_name):
@@ -1006,14 +4110,18 @@ class Ladderbot(commands.Cog):
         Admin only method for manually
         adding a win to a given team
         """
-        if team_name not in self.teams:
-            await ctx.send(f"Team {team_name} does not exist.")
-            return
-        
-        self.teams[team_name]['wins'] += 1
-        self.save_teams()
-        await ctx.send(f"Team {team_name} has had a win given to them by an Admin. They now have {self.teams[team_name]['wins']} wins.")
-    
+        ladder = await self.get_ladder(ctx)
+
+        async with ladder.locks.hold(team_name):
+            team = ladder.teams.get(team_name)
+            if team is not None:
+                team.wins += 1
+                ladder._log_event('record_changed', teams=[team_name])
+                message = f"Team {team_name} has had a win given to them by an Admin. They now have {team.wins} wins."
+            else:
+                message = f"Team {team_name} does not exist."
+        await ctx.send(message)
+
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def subtract_win(self, ctx, team_name):
@@ -1021,19 +4129,20 @@ class Ladderbot(commands.Cog):
         Admin only method for manually
         subtracting a win to a given team
         """
-        if team_name not in self.teams:
-            await ctx.send(f"Team {team_name} does not exist.")
-            return
-        
-        if self.teams[team_name]['wins'] < 1:
-            await ctx.send(f"Cannot complete command as {team_name} does not have any wins.")
-            return
-        
-        if self.teams[team_name]['wins'] >= 1:
-            self.teams[team_name]['wins'] -= 1
-            self.save_teams()
-            await ctx.send(f"Team {team_name} has had a win taken away by an Admin. They now have {self.teams[team_name]['wins']} wins.")
-    
+        ladder = await self.get_ladder(ctx)
+
+        async with ladder.locks.hold(team_name):
+            team = ladder.teams.get(team_name)
+            if team is None:
+                message = f"Team {team_name} does not exist."
+            elif team.wins < 1:
+                message = f"Cannot complete command as {team_name} does not have any wins."
+            else:
+                team.wins -= 1
+                ladder._log_event('record_changed', teams=[team_name])
+                message = f"Team {team_name} has had a win taken away by an Admin. They now have {team.wins} wins."
+        await ctx.send(message)
+
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def add_loss(self, ctx, team_name):
@@ -1041,14 +4150,18 @@ class Ladderbot(commands.Cog):
         Admin only method for manually
         adding a loss to a given team
         """
-        if team_name not in self.teams:
-            await ctx.send(f"Team {team_name} does not exist.")
-            return
-        
-        self.teams[team_name]['losses'] += 1
-        self.save_teams()
-        await ctx.send(f"Team {team_name} has had a loss given to them by an Admin. They now have {self.teams[team_name]['losses']} losses.")
-    
+        ladder = await self.get_ladder(ctx)
+
+        async with ladder.locks.hold(team_name):
+            team = ladder.teams.get(team_name)
+            if team is not None:
+                team.losses += 1
+                ladder._log_event('record_changed', teams=[team_name])
+                message = f"Team {team_name} has had a loss given to them by an Admin. They now have {team.losses} losses."
+            else:
+                message = f"Team {team_name} does not exist."
+        await ctx.send(message)
+
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def subtract_loss(self, ctx, team_name):
@@ -1056,41 +4169,69 @@ class Ladderbot(commands.Cog):
         Admin only method for manually
         subtracting a loss to a given team
         """
-        if team_name not in self.teams:
-            await ctx.send(f"Team {team_name} does not exist.")
-            return
-        
-        if self.teams[team_name]['losses'] < 1:
-            await ctx.send(f"Cannot complete command as {team_name} does not have any losses.")
-            return
-        
-        if self.teams[team_name]['losses'] >= 1:
-            self.teams[team_name]['losses'] -= 1
-            self.save_teams()
-            await ctx.send(f"Team {team_name} has had a loss taken away by an Admin. They now have {self.teams[team_name]['losses']} losses.")
-    
+        ladder = await self.get_ladder(ctx)
+
+        async with ladder.locks.hold(team_name):
+            team = ladder.teams.get(team_name)
+            if team is None:
+                message = f"Team {team_name} does not exist."
+            elif team.losses < 1:
+                message = f"Cannot complete command as {team_name} does not have any losses."
+            else:
+                team.losses -= 1
+                ladder._log_event('record_changed', teams=[team_name])
+                message = f"Team {team_name} has had a loss taken away by an Admin. They now have {team.losses} losses."
+        await ctx.send(message)
+
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def end_ladder(self, ctx):
-        if not self.ladder_running:
-            await ctx.send("The ladder is not currently running.")
-            return
-        
-        # Change ladder_running flag and save state.json
-        self.ladder_running = False
-        self.save_state()
+        ladder = await self.get_ladder(ctx)
+
+        # Holds the reason the ladder cannot end, sent once the locks are released
+        error = None
+
+        # Hold every team and the ladder so no command changes them while the final standings are taken
+        async with ladder.locks.hold(*ladder.teams, ladder=True):
+            if not ladder.ladder_running:
+                error = "The ladder is not currently running."
+            else:
+                # Archive the season before anything is cleared, so nothing is lost if it fails
+                try:
+                    season = await ladder.archive_season()
+                except OSError as e:
+                    error = f"Could not archive the season, so the ladder has not ended: {e}"
 
-        # Sort teams
-        sorted_teams = sorted(self.teams.items(), key=lambda x: (x[1]['rank'] is None, x[1]['rank']))
+            if not error:
+                # Change ladder_running flag and save state.json
+                ladder.ladder_running = False
+                ladder.save_state()
 
-        # Generate standings
-        standings = await self.generate_standings()
+                # Teams in rank order, taken straight from the ladder
+                sorted_teams = list(ladder.rank_order)
+
+                # Generate standings
+                standings = await ladder.generate_standings(ctx.guild)
+
+                # Clear matches and teams and save associated .json files
+                ladder.matches.clear()
+                ladder.teams.clear()
+                ladder.member_index.clear()
+                ladder.team_match_index.clear()
+                ladder.rank_order.clear()
+                ladder.standings_lines.clear()
+                ladder.deadlines.clear()
+                ladder.compact_event_log()
+
+        if error:
+            await ctx.send(error)
+            return
 
         if standings:
             # Create holders for 1st, 2nd, and 3rd place
-            first_place = sorted_teams[0][0] if len(sorted_teams) > 0 else "No team"
-            second_place = sorted_teams[1][0] if len(sorted_teams) > 1 else "No team"
-            third_place = sorted_teams[2][0] if len(sorted_teams) > 2 else "No team"
+            first_place = sorted_teams[0] if len(sorted_teams) > 0 else "No team"
+            second_place = sorted_teams[1] if len(sorted_teams) > 1 else "No team"
+            third_place = sorted_teams[2] if len(sorted_teams) > 2 else "No team"
 
             # Store standings and first three places together in announcement
             announcement = (
@@ -1101,25 +4242,114 @@ class Ladderbot(commands.Cog):
             f"**3rd Place:** {third_place}"
             )
 
+            # Split the announcement over several messages if it is too long for one
+            announcement_pages = PagedBoard.paginate(announcement.split('\n'))
+
             # Send announcement data to channel that end_ladder was called from
-            await ctx.send(announcement)
+            for page in announcement_pages:
+                await ctx.send(page)
 
             # Send data to standings channel if one is chosen
-            if self.standings_channel_id:
-                channel = self.bot.get_channel(self.standings_channel_id)
-                await channel.send(announcement)
+            if ladder.standings_channel_id:
+                channel = self.bot.get_channel(ladder.standings_channel_id)
+                for page in announcement_pages:
+                    await channel.send(page)
         else:
             await ctx.send("Standings are not available yet.")
-        
-        # Clear matches and teams and save associated .json files
-        self.matches.clear()
-        self.teams.clear()
-        self.save_matches()
-        self.save_teams()
-
-        # Inform the ladder has ended and all data from teams and matches has been cleared
-        await ctx.send("The ladder has now ended. All teams and matches have been cleared. Thank you for playing!")
-    
+
+        # Inform the ladder has ended and all data from teams and matches has been archived and cleared
+        await ctx.send(f"The ladder has now ended and has been archived as Season {season['season']}. All teams and matches have been cleared, "
+                       f"use !season_standings {season['season']} to see the final standings again. Thank you for playing!")
+
+    @commands.command()
+    async def season_standings(self, ctx, season: int = None):
+        """
+        Callable method by everyone to post the final
+        standings of an archived season. Without a
+        season number the archived seasons are listed.
+        """
+        ladder = await self.get_ladder(ctx)
+
+        # List the seasons from the index without reading any season file
+        if season is None:
+            if not ladder.seasons.seasons:
+                await ctx.send("No seasons have been archived yet, a season is archived when the ladder ends.")
+                return
+            lines = ["**Archived Seasons:**"]
+            for entry in ladder.seasons.seasons:
+                ended = time.strftime('%Y-%m-%d', time.localtime(entry['ended']))
+                winner = entry['top_teams'][0] if entry['top_teams'] else "No team"
+                lines.append(f"Season {entry['season']} - ended {ended}, {entry['teams']} teams, won by {winner}")
+            for page in PagedBoard.paginate(lines):
+                await ctx.send(page)
+            return
+
+        try:
+            data = await ladder.seasons.load(season)
+        except (OSError, ValueError) as e:
+            await ctx.send(f"Could not read Season {season}: {e}")
+            return
+        if data is None:
+            await ctx.send(f"Season {season} does not exist. Use !season_standings to list the archived seasons.")
+            return
+
+        # Look up the names of every member of the season at once, mostly from cache
+        names = await ladder.name_cache.resolve([member_id for team in data['teams'] for member_id in team['members']], ctx.guild)
+
+        ended = time.strftime('%Y-%m-%d', time.localtime(data['ended']))
+        matches_played = ladder.seasons.result_count(ladder.seasons.get(season))
+        lines = [f"**Season {season} Final Standings** (ended {ended}, {matches_played} matches played):"]
+        for team in data['teams']:
+            member_names = [names[member_id] for member_id in team['members']]
+            lines.append(f"{team['rank']}. {team['team_name']} ({' - '.join(member_names)}) - W: {team['wins']} L: {team['losses']}")
+        for page in PagedBoard.paginate(lines):
+            await ctx.send(page)
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def use_ladder(self, ctx, ladder_name=DEFAULT_LADDER):
+        """
+        Admin only method to make every command called
+        from this channel use a separate named ladder,
+        so one guild can run several ladders at once.
+
+        Calling it without a name switches the channel
+        back to the default ladder of the guild.
+        """
+        if not re.fullmatch(r'[A-Za-z0-9_-]{1,32}', ladder_name):
+            await ctx.send("Ladder names may only use letters, numbers, - and _ and be at most 32 characters long.")
+            return
+
+        self.ladders.set_channel_ladder(ctx.guild.id, ctx.channel.id, ladder_name)
+        await ctx.send(f"Commands called from {ctx.channel.mention} now use the '{ladder_name}' ladder.")
+
+    @commands.command()
+    async def list_ladders(self, ctx):
+        """
+        Callable method by everyone to list every ladder
+        of the guild and show which one this channel uses.
+        """
+        current = self.ladders.ladder_name_of(ctx.guild.id, ctx.channel.id)
+        ladder_names = [f"**{name}** (this channel)" if name == current else name for name in self.ladders.ladder_names(ctx.guild.id)]
+        await ctx.send("Ladders in this server: " + ", ".join(ladder_names))
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def ladder_stats(self, ctx):
+        """
+        Admin only method that shows how many times the
+        commands, saves, board updates and requests to
+        Discord ran and how long they took.
+        """
+        if not metrics.enabled:
+            await ctx.send("Metrics are turned off. Set METRICS_ENABLED to True to collect them.")
+            return
+
+        uptime = int(time.time() - metrics.started)
+        lines = metrics.summary_lines() or ["Nothing has been recorded yet."]
+        for page in PagedBoard.paginate([f"**Ladder Stats** (last {uptime // 3600}h {uptime % 3600 // 60}m):", *lines]):
+            await ctx.send(page)
+
     @commands.command()
     async def show_help(self, ctx):
         """
@@ -1146,7 +4376,8 @@ bot = commands.Bot(command_prefix='!', intents=intents)
 
 # Define a main function to properly add cog to bot and start from specified token
 async def main():
-    await bot.add_cog(Ladderbot(bot))
+    ladderbot = Ladderbot(bot)
+    await bot.add_cog(ladderbot)
     
     """
     NOTE: IF USING A MANUAL TOKEN, GO BACK TO TOP OF CODE AND DELETE THE 'from my_token import MY_DISCORD_TOKEN' LINE
@@ -1167,10 +4398,16 @@ async def main():
     
     """
     
-    await bot.start(MY_DISCORD_TOKEN)
+    try:
+        await bot.start(MY_DISCORD_TOKEN)
+    finally:
+        # Send any queued notifications and flush any pending writes to storage before the process exits
+        await ladderbot.notifier.close()
+        await ladderbot.ladders.close()
 
 
-asyncio.run(main())
+if __name__ == '__main__':
+    asyncio.run(main())
 
 """
 This entire project can be found at:
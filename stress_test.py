@@ -0,0 +1,276 @@
+"""
+Stress test for the ladder commands running at the same time.
+
+Fires hundreds of commands at one ladder within a few
+milliseconds of each other, using the fake bot, channel and
+users of benchmark.py with a simulated latency on every
+Discord request, so commands interleave at every await like
+they do on a busy server.
+Rounds mix registrations, challenges, reports, cancels, rank
+and record changes, team removals and an occasional
+!end_ladder. After every round the ladder is checked:
+
+- ranks run from 1 without gaps and match the rank order
+- the member and match indexes agree with the teams and matches
+- every confirmed registration is still there, unless the team
+  was removed, or archived by an !end_ladder in the same round
+- no team lock is left behind once every command has finished
+- loading the ladder again from disk gives the same ladder
+
+    python stress_test.py
+    python stress_test.py --rounds 20 --commands 1000 --latency 5 --spread 100
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+
+import benchmark
+import ladderbot2
+
+
+class RecordingContext(benchmark.FakeContext):
+    """
+    A FakeContext that remembers every message sent to it.
+    """
+    def __init__(self, author, guild, channel):
+        super().__init__(author, guild, channel)
+        self.messages = []
+
+    async def send(self, content=None, **kwargs):
+        self.messages.append(content)
+        return await super().send(content, **kwargs)
+
+
+class LadderStressTest:
+    """
+    One ladder and the commands fired at it.
+    """
+    def __init__(self, latency, spread):
+        self.bot = benchmark.BenchmarkBot(latency)
+        self.spread = spread
+        self.guild = benchmark.FakeGuild(1)
+        self.channel = benchmark.FakeChannel(1, self.guild, self.bot)
+        self.bot.fake_channels[self.channel.id] = self.channel
+        self.cog = None
+        self.ladder = None
+        self.admin = None
+        self.next_user_id = 1
+        self.next_team = 0
+
+    def new_user(self):
+        user = benchmark.FakeUser(self.next_user_id, self.bot)
+        self.next_user_id += 1
+        self.guild.members[user.id] = user
+        self.bot.fake_users[user.id] = user
+        return user
+
+    def ctx(self, author):
+        return RecordingContext(author, self.guild, self.channel)
+
+    def member_of(self, team_name):
+        return self.guild.members[self.ladder.teams[team_name].members[0]]
+
+    async def setup(self, team_count):
+        self.cog = ladderbot2.Ladderbot(self.bot)
+        await self.bot.add_cog(self.cog)
+        self.admin = self.new_user()
+        self.ladder = await self.cog.get_ladder(self.ctx(self.admin))
+        for _ in range(team_count):
+            await self.cog.admin_register_team.callback(self.cog, self.ctx(self.admin), self.new_team_name(), self.new_user())
+        await self.cog.start_ladder.callback(self.cog, self.ctx(self.admin))
+
+    async def close(self):
+        await self.bot.remove_cog(self.cog.qualified_name)
+
+    def new_team_name(self):
+        self.next_team += 1
+        return f"Team{self.next_team}"
+
+    def random_team(self):
+        return random.choice(self.ladder.rank_order) if self.ladder.rank_order else "NoSuchTeam"
+
+    # Every command is picked against the ladder as it is when the round starts,
+    # so many of them are stale by the time they run, which is the point
+
+    def register_team(self):
+        ctx = self.ctx(self.new_user())
+        members = [ctx.author]
+        if random.random() < 0.3:
+            members.append(self.new_user())
+
+        # Sometimes take a name or member that is already in use
+        team_name = self.new_team_name() if random.random() < 0.8 else self.random_team()
+        if random.random() < 0.1 and self.ladder.teams:
+            members.append(self.member_of(self.random_team()))
+        return ctx, self.cog.register_team.callback(self.cog, ctx, team_name, *members)
+
+    def challenge(self):
+        team_name = self.random_team()
+        if team_name not in self.ladder.teams:
+            return self.register_team()
+        rank = self.ladder.teams[team_name].rank
+        target = self.ladder.rank_order[max(0, rank - random.randint(1, 3) - 1)]
+        ctx = self.ctx(self.member_of(team_name))
+        return ctx, self.cog.challenge.callback(self.cog, ctx, team_name, target)
+
+    def report_win(self):
+        if not self.ladder.matches:
+            return self.challenge()
+        match = random.choice(list(self.ladder.matches.values()))
+        winner = random.choice([match.challenger, match.challenged])
+        ctx = self.ctx(self.member_of(winner))
+        return ctx, self.cog.report_win.callback(self.cog, ctx, winner)
+
+    def cancel_challenge(self):
+        if not self.ladder.matches:
+            return self.challenge()
+        match = random.choice(list(self.ladder.matches.values()))
+        ctx = self.ctx(self.member_of(match.challenger))
+        return ctx, self.cog.cancel_challenge.callback(self.cog, ctx, match.challenger)
+
+    def set_rank(self):
+        ctx = self.ctx(self.admin)
+        return ctx, self.cog.set_rank.callback(self.cog, ctx, self.random_team(), random.randint(1, max(1, len(self.ladder.teams))))
+
+    def change_record(self):
+        ctx = self.ctx(self.admin)
+        command = random.choice([self.cog.add_win, self.cog.subtract_win, self.cog.add_loss, self.cog.subtract_loss])
+        return ctx, command.callback(self.cog, ctx, self.random_team())
+
+    def remove_team(self):
+        ctx = self.ctx(self.admin)
+        return ctx, self.cog.remove_team.callback(self.cog, ctx, self.random_team())
+
+    def end_ladder(self):
+        ctx = self.ctx(self.admin)
+        return ctx, self.cog.end_ladder.callback(self.cog, ctx)
+
+    # Command -> how often it is picked
+    COMMANDS = {
+        'register_team': 20,
+        'challenge': 30,
+        'report_win': 20,
+        'cancel_challenge': 5,
+        'set_rank': 5,
+        'change_record': 15,
+        'remove_team': 3,
+    }
+
+    async def start_later(self, call):
+        """
+        Starts a command at a random moment within the spread,
+        so commands also arrive while others are halfway done.
+        """
+        await asyncio.sleep(random.uniform(0, self.spread))
+        await call
+
+    async def run_round(self, command_count, end_ladder):
+        """
+        Fires command_count commands at once and checks the
+        ladder once all of them have finished.
+        """
+        names = list(self.COMMANDS)
+        weights = list(self.COMMANDS.values())
+        calls = [getattr(self, name)() for name in random.choices(names, weights, k=command_count)]
+        if end_ladder:
+            calls.insert(random.randrange(len(calls)), self.end_ladder())
+        await asyncio.gather(*(self.start_later(call) for _, call in calls))
+
+        messages = [message for ctx, _ in calls for message in ctx.messages]
+        registered = {message.split()[1] for message in messages if ' has been registered with members: ' in message}
+        removed = {message.split()[-4] for message in messages if message.startswith('An Admin has removed Team ')}
+        ended = any(message.startswith('The ladder has now ended') for message in messages)
+
+        # Teams cleared by !end_ladder must have made it into the archived season
+        archived = set()
+        if ended:
+            season = await self.ladder.seasons.load(self.ladder.seasons.seasons[-1]['season'])
+            archived = {team['team_name'] for team in season['teams']}
+        self.check(registered - removed - archived)
+
+        if ended:
+            await self.cog.start_ladder.callback(self.cog, self.ctx(self.admin))
+        return len(registered), ended
+
+    def check(self, registered):
+        """
+        Checks that the ladder is consistent, and that every
+        registration confirmed in the round and not archived
+        by !end_ladder was kept.
+        """
+        ladder = self.ladder
+
+        if sorted(ladder.rank_order) != sorted(ladder.teams):
+            raise AssertionError("The rank order and the teams do not hold the same teams.")
+        for rank, team_name in enumerate(ladder.rank_order, start=1):
+            if ladder.teams[team_name].rank != rank:
+                raise AssertionError(f"{team_name} has rank {ladder.teams[team_name].rank} but is number {rank} in the rank order.")
+
+        member_index = {member_id: team_name for team_name, team in ladder.teams.items() for member_id in team.members}
+        if member_index != ladder.member_index:
+            raise AssertionError("The member index does not match the members of the teams.")
+
+        team_match_index = {}
+        for match_id, match in ladder.matches.items():
+            for team_name in (match.challenger, match.challenged):
+                if team_name in team_match_index or team_name not in ladder.teams:
+                    raise AssertionError(f"Match {match_id} involves {team_name}, which is missing or in another match.")
+                team_match_index[team_name] = match_id
+        if team_match_index != ladder.team_match_index:
+            raise AssertionError("The match index does not match the matches.")
+
+        missing = registered - set(ladder.teams)
+        if missing:
+            raise AssertionError(f"{len(missing)} confirmed team(s) were lost, such as {sorted(missing)[:5]}.")
+
+        if ladder.locks.team_locks or ladder.locks.in_use():
+            raise AssertionError(f"{len(ladder.locks.team_locks)} team lock(s) were left behind after every command finished.")
+
+    async def check_reload(self):
+        """
+        Loads the ladder again from disk and compares it
+        with the one in memory.
+        """
+        await self.ladder.storage.flush()
+        reloaded = ladderbot2.Ladder(self.bot, self.ladder.directory, self.cog.name_cache, self.cog.notifier, self.cog.scheduler)
+        if reloaded.teams != self.ladder.teams or reloaded.matches != self.ladder.matches or reloaded.rank_order != self.ladder.rank_order:
+            raise AssertionError("The ladder loaded from disk differs from the one in memory.")
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as directory:
+        # The cog stores its ladders relative to the working directory
+        os.chdir(directory)
+        test = LadderStressTest(args.latency / 1000, args.spread / 1000)
+        await test.setup(args.teams)
+        for round_number in range(1, args.rounds + 1):
+            end_ladder = round_number % args.end_every == 0
+            registered, ended = await test.run_round(args.commands, end_ladder)
+            print(f"round {round_number}: {len(test.ladder.teams)} teams, {len(test.ladder.matches)} matches, "
+                  f"{registered} registered{', ladder ended' if ended else ''}")
+        await test.check_reload()
+        await test.close()
+        os.chdir(args.start_directory)
+    print(f"The ladder stayed consistent through {args.rounds} rounds of {args.commands} concurrent commands.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fire many concurrent commands at a ladder and check it stays consistent.")
+    parser.add_argument('--rounds', type=int, default=10, help="number of rounds of concurrent commands")
+    parser.add_argument('--commands', type=int, default=500, help="commands fired at once every round")
+    parser.add_argument('--teams', type=int, default=100, help="teams registered before the first round")
+    parser.add_argument('--end-every', type=int, default=4, help="end the ladder during every n-th round")
+    parser.add_argument('--latency', type=float, default=2.0, help="simulated latency of every Discord request in ms")
+    parser.add_argument('--spread', type=float, default=50.0, help="time in ms over which the commands of a round arrive")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    args.start_directory = os.getcwd()
+    random.seed(args.seed)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()